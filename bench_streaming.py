@@ -0,0 +1,216 @@
+# Headless world streaming benchmark.
+# Drives World along scripted player paths the way the game loop does and
+# reports latency percentiles for the streaming hot spots, resident memory and
+# bytes on disk. Uses only world.py and constants.py, so it needs no display.
+# Usage: py bench_streaming.py [straight|spiral|border|teleport ...]
+# Paths and seed are fixed: rerun after every storage change to World and
+# compare against the previous numbers.
+
+import math
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from constants import *
+from world import World
+
+SEED = 12345  # Fixed so every run streams the same chunks
+FRAMES = 2000  # Simulated frames per path
+FRAME_MS = 16  # Game time per frame, about 60 FPS
+SAIL_SPEED = 0.5  # Tiles per frame on the straight and spiral paths
+BORDER_SWING = 3  # Tiles either side of the chunk edge on the border path
+TELEPORT_INTERVAL = 30  # Frames between jumps on the teleport path
+TELEPORT_SPAN = 100  # Teleports land anywhere in TELEPORT_SPAN x TELEPORT_SPAN chunks (10k)
+EDIT_INTERVAL = 10  # Frames between tile edits, so chunks get dirty and are saved
+PERCENTILES = (50, 95, 99)
+BENCH_DIR = os.path.join(CHUNK_DIR, "bench-streaming")  # Save slot the benchmark worlds are written to
+
+
+class LatencyHistogram:
+    """Latency samples bucketed to a few significant digits.
+
+    Holding every get_tile sample would cost more memory than the world
+    being measured, so values are rounded to 10 ns below 10 us and to
+    1 us above; percentiles are exact to that resolution.
+    """
+
+    def __init__(self):
+        self.buckets = Counter()
+        self.count = 0
+        self.lock = threading.Lock()  # Saves are timed on the saver thread
+
+    def record(self, seconds):
+        ns = int(seconds * 1e9)
+        bucket = ns - ns % 10 if ns < 10000 else ns - ns % 1000
+        with self.lock:
+            self.buckets[bucket] += 1
+            self.count += 1
+
+    def percentile(self, p):
+        # Smallest bucket at or below which p percent of the samples fall, in seconds.
+        rank = math.ceil(self.count * p / 100)
+        seen = 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen >= rank:
+                return bucket / 1e9
+        return 0.0
+
+
+def straight_path(frames):
+    # Sail east in a straight line: a new column of chunks every CHUNK_SIZE / SAIL_SPEED frames.
+    for frame in range(frames):
+        yield (frame * SAIL_SPEED, 0.0), (SAIL_SPEED, 0.0)
+
+
+def spiral_path(frames):
+    # Outward spiral at constant speed, crossing chunk edges in every direction.
+    angle, x, y = 0.0, 0.0, 0.0
+    for _ in range(frames):
+        radius = CHUNK_SIZE * angle / (2 * math.pi)
+        angle += SAIL_SPEED / max(radius, CHUNK_SIZE)
+        radius = CHUNK_SIZE * angle / (2 * math.pi)
+        nx, ny = radius * math.cos(angle), radius * math.sin(angle)
+        yield (nx, ny), (nx - x, ny - y)
+        x, y = nx, ny
+
+
+def border_path(frames):
+    # Walk back and forth across one chunk edge: the case hysteresis and the warm cache exist for.
+    x = float(CHUNK_SIZE)
+    step = SAIL_SPEED
+    for _ in range(frames):
+        if abs(x + step - CHUNK_SIZE) > BORDER_SWING:
+            step = -step
+        x += step
+        yield (x, 0.5), (step, 0.0)
+
+
+def teleport_path(frames):
+    # Jump to a random chunk of a 10k chunk square every TELEPORT_INTERVAL frames, drifting east in between.
+    rng = random.Random(SEED)
+    x = y = 0.0
+    for frame in range(frames):
+        if frame % TELEPORT_INTERVAL == 0:
+            x = (rng.randrange(TELEPORT_SPAN) - TELEPORT_SPAN // 2) * CHUNK_SIZE + rng.random() * CHUNK_SIZE
+            y = (rng.randrange(TELEPORT_SPAN) - TELEPORT_SPAN // 2) * CHUNK_SIZE + rng.random() * CHUNK_SIZE
+            yield (x, y), (0.0, 0.0)
+        else:
+            x += SAIL_SPEED
+            yield (x, y), (SAIL_SPEED, 0.0)
+
+
+PATHS = {
+    "straight": straight_path,
+    "spiral": spiral_path,
+    "border": border_path,
+    "teleport": teleport_path,
+}
+
+
+def timed(function, histogram, main_thread_only=False):
+    """Wrap function so each call's duration is recorded in histogram."""
+    def wrapper(*args):
+        if main_thread_only and threading.current_thread() is not threading.main_thread():
+            return function(*args)
+        start = time.perf_counter()
+        try:
+            return function(*args)
+        finally:
+            histogram.record(time.perf_counter() - start)
+    return wrapper
+
+
+def resident_bytes():
+    # Current resident set size of this process (worker processes are not included).
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024  # Peak, not current, off Linux
+
+
+def disk_bytes():
+    total = 0
+    for filename in os.listdir(BENCH_DIR):
+        path = os.path.join(BENCH_DIR, filename)
+        if os.path.isfile(path):
+            total += os.path.getsize(path)
+    return total
+
+
+def run_path(name, frames=FRAMES):
+    """Stream a fresh world along one path and print its numbers.
+
+    Each frame mirrors the game loop: stamp the tick, run manage_chunks
+    when the player changes chunk, prefetch, read the whole view through
+    get_tile, occasionally edit a tile, flush the journal and compact it
+    every SAVE_CHUNK_INTERVAL of game time.
+    """
+    histograms = {key: LatencyHistogram() for key in ("get_tile", "manage_chunks", "generate", "load", "save", "encode")}
+    world = World(SEED, BENCH_DIR)
+    world.clear_chunk_files()
+    # Instance attributes shadow the methods, so World's own calls are timed too
+    world.generate_chunk = timed(world.generate_chunk, histograms["generate"], main_thread_only=True)
+    world.load_chunk = timed(world.load_chunk, histograms["load"])
+    world.save_chunk = timed(world.save_chunk, histograms["save"])
+    world.saver.encode = timed(world.saver.encode, histograms["encode"])
+    world.initialize_starting_area()
+    world.manage_chunks()
+
+    get_tile = world.get_tile
+    get_tile_histogram = histograms["get_tile"]
+    clock = time.perf_counter
+    visited = set()
+    start = clock()
+    for frame, (pos, velocity) in enumerate(PATHS[name](frames)):
+        world.tick = frame * FRAME_MS
+        old_chunk = world.player_chunk
+        world.update_player_chunk(pos)
+        if world.player_chunk != old_chunk:
+            t = clock()
+            world.manage_chunks()
+            histograms["manage_chunks"].record(clock() - t)
+        visited.add(world.player_chunk)
+        world.prefetch(pos, velocity)
+        world.prefetch_step()
+        left = int(pos[0] - VIEW_WIDTH // 2)
+        top = int(pos[1] - VIEW_HEIGHT // 2)
+        for y in range(top, top + VIEW_HEIGHT):
+            for x in range(left, left + VIEW_WIDTH):
+                t = clock()
+                get_tile(x, y)
+                get_tile_histogram.record(clock() - t)
+        if frame % EDIT_INTERVAL == 0:
+            x, y = int(pos[0]), int(pos[1])
+            world.set_tile(x, y, Tile.BOAT if world.get_tile(x, y) == Tile.WATER else Tile.WATER)
+        world.flush_journal()
+        if world.tick and world.tick % SAVE_CHUNK_INTERVAL < FRAME_MS:
+            world.compact_journal()
+    seconds = clock() - start
+    rss = resident_bytes()
+    loaded = len(world.chunks)
+    world.close()
+
+    print(f"{name}: {frames} frames in {seconds:.2f} s, {len(visited)} chunks visited, {loaded} loaded at the end")
+    print(f"  {'':<14}" + "".join(f"{'p' + str(p):>11}" for p in PERCENTILES) + f"{'samples':>11}")
+    for key, histogram in histograms.items():
+        if not histogram.count:
+            print(f"  {key:<14}{'-':>11}{'-':>11}{'-':>11}{0:>11}")
+            continue
+        row = "".join(f"{histogram.percentile(p) * 1e6:9.1f}us" for p in PERCENTILES)
+        print(f"  {key:<14}{row}{histogram.count:>11}")
+    print(f"  resident {rss / 2**20:.1f} MiB   on disk {disk_bytes() / 1024:.1f} KiB")
+
+
+if __name__ == "__main__":
+    names = sys.argv[1:] or list(PATHS)
+    for name in names:
+        if name not in PATHS:
+            print(f"Unknown path {name}; choose from {', '.join(PATHS)}")
+            continue
+        run_path(name)
@@ -0,0 +1,196 @@
+# Headless micro-benchmarks for world.py.
+# Usage: py bench_world.py
+# Needs no display; cachetools is only required for the LRU comparison.
+
+import os
+import time
+import zlib
+import numpy as np
+from constants import *
+from world import World, TILES, chunk_rng
+from world import BIOMES, chunk_elevation, generate_chunk_data, generate_chunk_block
+from chunk_codec import encode_chunk, decode_chunk, rle_encode
+
+FRAMES = 300  # Simulated frames per benchmark
+CODEC_CHUNKS = 2000  # Generated chunks encoded by the codec benchmark
+GENERATE_CHUNKS = 2025  # Chunks per biome in the generation benchmark, a 45x45 block
+SPEED = 0.15  # Tiles per frame, the player's walking speed
+BENCH_DIR = os.path.join(CHUNK_DIR, "bench-world")  # Save slot the benchmark worlds are written to
+# In-bounds 4-neighbours of each tile index, for counting islands
+NEIGHBORS = tuple(
+    tuple(ny * CHUNK_SIZE + nx
+          for nx, ny in ((x, y + 1), (x, y - 1), (x + 1, y), (x - 1, y))
+          if 0 <= nx < CHUNK_SIZE and 0 <= ny < CHUNK_SIZE)
+    for y in range(CHUNK_SIZE) for x in range(CHUNK_SIZE))
+
+
+def draw_grid_pattern(reader, frames=FRAMES):
+    """Replay draw_grid's tile reads while walking east.
+
+    draw_grid reads the 30x30 view three times per frame (base tiles, the
+    tile below for underlays, overlays), about 2,700 get_tile calls.
+    Chunk streaming happens outside the timed section.
+    Returns (calls, seconds).
+    """
+    world = reader.world
+    get_tile = reader.get_tile
+    pos = [0.0, 0.0]
+    calls = 0
+    seconds = 0.0
+    for _ in range(frames):
+        pos[0] += SPEED
+        old_chunk = world.player_chunk
+        world.update_player_chunk(pos)
+        if world.player_chunk != old_chunk:
+            world.manage_chunks()
+        left = int(pos[0] - VIEW_WIDTH // 2)
+        top = int(pos[1] - VIEW_HEIGHT // 2)
+        start = time.perf_counter()
+        for _ in range(3):
+            for y in range(VIEW_HEIGHT):
+                for x in range(VIEW_WIDTH):
+                    get_tile(left + x, top + y)
+        seconds += time.perf_counter() - start
+        calls += 3 * VIEW_WIDTH * VIEW_HEIGHT
+    return calls, seconds
+
+
+class DirectReader:
+    """World.get_tile as shipped."""
+
+    def __init__(self, world):
+        self.world = world
+        self.get_tile = world.get_tile
+
+
+class LRUReader:
+    """The previous get_tile: an LRUCache of 10,000 (x, y) keys in front of the chunks."""
+
+    def __init__(self, world):
+        from cachetools import LRUCache
+        self.world = world
+        self.tile_cache = LRUCache(maxsize=10000)
+
+    def get_tile(self, x, y):
+        key = (x, y)
+        if key in self.tile_cache:
+            return self.tile_cache[key]
+        cx, cy = self.world.world_to_chunk(x, y)
+        tx = int(x % CHUNK_SIZE)
+        ty = int(y % CHUNK_SIZE)
+        if tx < 0:
+            tx += CHUNK_SIZE
+        if ty < 0:
+            ty += CHUNK_SIZE
+        tile = TILES[self.world.ensure_chunk(cx, cy)[ty * CHUNK_SIZE + tx]]
+        self.tile_cache[key] = tile
+        return tile
+
+
+def chunk_stats(chunks):
+    """Mean per-chunk counts of each tile type and of 4-connected islands."""
+    counts = {}
+    islands = 0
+    for chunk in chunks:
+        for tile in set(chunk):
+            counts[TILES[tile].name] = counts.get(TILES[tile].name, 0) + chunk.count(tile)
+        seen = set()
+        for i in range(CHUNK_AREA):
+            if chunk[i] != Tile.WATER and i not in seen:
+                islands += 1
+                stack = [i]
+                seen.add(i)
+                while stack:
+                    for n in NEIGHBORS[stack.pop()]:
+                        if chunk[n] != Tile.WATER and n not in seen:
+                            seen.add(n)
+                            stack.append(n)
+    stats = {name: count / len(chunks) for name, count in counts.items() if name != "WATER"}
+    stats["islands"] = islands / len(chunks)
+    return stats
+
+
+def new_world():
+    world = World(directory=BENCH_DIR)
+    world.clear_chunk_files()
+    world.initialize_starting_area()
+    world.manage_chunks()
+    return world
+
+
+def bench_get_tile():
+    print("get_tile (draw_grid access pattern)")
+    results = {}
+    for name, reader_class in (("direct + chunk memo", DirectReader), ("LRUCache", LRUReader)):
+        world = new_world()
+        try:
+            reader = reader_class(world)
+        except ImportError:
+            print(f"  {name:<22} skipped (cachetools not installed)")
+            continue
+        calls, seconds = draw_grid_pattern(reader)
+        results[name] = seconds / calls
+        print(f"  {name:<22} {seconds / calls * 1e9:8.1f} ns/call   {calls} calls")
+        world.close()
+    if len(results) == 2:
+        direct, lru = results.values()
+        print(f"  speedup: {lru / direct:.2f}x")
+
+
+def bench_codec():
+    print(f"chunk records ({CODEC_CHUNKS} generated chunks)")
+    world = World(directory=BENCH_DIR)
+    chunks = [bytes(world.generate_chunk(i % 50, i // 50)) for i in range(CODEC_CHUNKS)]
+    world.close()
+    formats = (
+        ("raw", lambda c: b"\x01" + c),
+        ("RLE", lambda c: b"\x02" + rle_encode(c)),
+        ("RLE + zlib", lambda c: b"\x03" + zlib.compress(rle_encode(c), CHUNK_ZLIB_LEVEL)),
+        ("smallest (shipped)", encode_chunk),
+    )
+    for name, encode in formats:
+        start = time.perf_counter()
+        records = [encode(c) for c in chunks]
+        encode_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        for record in records:
+            decode_chunk(record)
+        decode_seconds = time.perf_counter() - start
+        size = sum(len(r) for r in records)
+        print(f"  {name:<20} {size / len(chunks):7.1f} B/chunk"
+              f"   encode {encode_seconds / len(chunks) * 1e6:6.1f} us"
+              f"   decode {decode_seconds / len(chunks) * 1e6:6.1f} us")
+
+
+def bench_generate():
+    print(f"chunk generation ({GENERATE_CHUNKS} chunks per biome)")
+    side = int(GENERATE_CHUNKS ** 0.5)
+    for name, generator, _ in BIOMES:
+        print(f"  {name}")
+        keys = [(100 + x, y) for y in range(side) for x in range(side)]
+        # The biome's own sea level everywhere, not blended with its neighbours
+        sea_level = np.full((side * CHUNK_SIZE, side * CHUNK_SIZE), 1 - generator.land_fraction)
+        chunk_sea = sea_level[:CHUNK_SIZE, :CHUNK_SIZE]
+        start = time.perf_counter()
+        chunks = [generator.generate(cx, cy, chunk_rng(1, cx, cy), chunk_elevation(1, cx, cy), chunk_sea) for cx, cy in keys]
+        single_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        elevation = chunk_elevation(1, 100, 0, side, side)
+        for cx, cy in keys:
+            x, y = (cx - 100) * CHUNK_SIZE, cy * CHUNK_SIZE
+            tiles = (slice(y, y + CHUNK_SIZE), slice(x, x + CHUNK_SIZE))
+            generator.generate(cx, cy, chunk_rng(1, cx, cy), elevation[tiles], sea_level[tiles])
+        block_seconds = time.perf_counter() - start
+        stats = "  ".join(f"{key} {value:5.2f}" for key, value in sorted(chunk_stats(chunks).items()))
+        print(f"    per chunk {single_seconds / len(keys) * 1e6:7.1f} us/chunk   "
+              f"one block {block_seconds / len(keys) * 1e6:7.1f} us/chunk   {stats}")
+    # Reference check: the block path the pool and pregen.py use must give the game's chunks exactly
+    block = generate_chunk_block(1, 100, 0, side, side)
+    mismatches = sum(tiles != generate_chunk_data(1, cx, cy) for (cx, cy), (_, tiles) in block.items())
+    print(f"  generate_chunk_block vs generate_chunk_data: {mismatches} of {len(block)} chunks differ")
+
+
+if __name__ == "__main__":
+    bench_get_tile()
+    bench_codec()
+    bench_generate()
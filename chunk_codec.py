@@ -0,0 +1,125 @@
+# On-disk encoding of chunk records.
+# Every record starts with a format byte. Generated chunks are 90%+ water, so
+# run-length encoding (optionally deflated with zlib) shrinks most of them
+# from CHUNK_AREA bytes to a few dozen. Since generation is deterministic, a
+# chunk can also be stored as just the tiles that differ from its generated
+# baseline, which is usually a handful of bytes.
+
+import re
+import zlib
+from constants import CHUNK_AREA, CHUNK_ZLIB_LEVEL
+
+FORMAT_RAW = 1  # CHUNK_AREA tile bytes as-is
+FORMAT_RLE = 2  # (run length, tile) byte pairs, runs capped at 255
+FORMAT_RLE_ZLIB = 3  # FORMAT_RLE pairs compressed with zlib
+FORMAT_DELTA = 4  # (index low, index high, tile) triples applied to the regenerated baseline
+
+RUN = re.compile(rb"(.)\1{0,254}", re.S)  # One run of at most 255 equal bytes
+
+
+def rle_encode(tiles):
+    """Return tiles as (run length, tile) byte pairs."""
+    out = bytearray()
+    for run in RUN.finditer(tiles):
+        out.append(run.end() - run.start())
+        out += run.group(1)
+    return bytes(out)
+
+
+def rle_decode(pairs):
+    """Expand (run length, tile) byte pairs back into tile bytes.
+
+    Raises:
+        ValueError: An odd number of bytes, as left by a truncated record.
+    """
+    if len(pairs) % 2:
+        raise ValueError("truncated run-length chunk record")
+    return b"".join(bytes((pairs[i + 1],)) * pairs[i] for i in range(0, len(pairs), 2))
+
+
+def delta_encode(tiles, baseline):
+    """Return the tiles that differ from baseline as (index low, index high, tile) triples."""
+    out = bytearray()
+    for index, (old, new) in enumerate(zip(baseline, tiles)):
+        if old != new:
+            out += bytes((index & 0xFF, index >> 8, new))
+    return bytes(out)
+
+
+def delta_apply(changes, baseline):
+    """Return a copy of baseline with (index low, index high, tile) triples applied.
+
+    Raises:
+        ValueError: A partial triple, or an index outside the baseline.
+    """
+    if len(changes) % 3:
+        raise ValueError("truncated chunk delta")
+    tiles = bytearray(baseline)
+    for i in range(0, len(changes), 3):
+        index = changes[i] | changes[i + 1] << 8
+        if index >= len(tiles):
+            raise ValueError(f"chunk delta index {index} out of range")
+        tiles[index] = changes[i + 2]
+    return tiles
+
+
+def encode_chunk(tiles, baseline=None, zlib_level=CHUNK_ZLIB_LEVEL):
+    """Encode a chunk with the smallest of the available formats.
+
+    Args:
+        tiles (bytes-like): CHUNK_AREA tile values.
+        baseline (bytes-like): The chunk as generated, or None to skip FORMAT_DELTA.
+        zlib_level (int): zlib level for FORMAT_RLE_ZLIB, or 0 to skip zlib.
+
+    Returns:
+        bytes: Format byte followed by the payload.
+    """
+    rle = rle_encode(tiles)
+    best = (FORMAT_RLE, rle)
+    if zlib_level:
+        packed = zlib.compress(rle, zlib_level)
+        if len(packed) < len(rle):
+            best = (FORMAT_RLE_ZLIB, packed)
+    if baseline is not None:
+        changes = delta_encode(tiles, baseline)
+        if len(changes) < len(best[1]):
+            best = (FORMAT_DELTA, changes)
+    if len(best[1]) >= CHUNK_AREA:
+        best = (FORMAT_RAW, bytes(tiles))
+    return bytes((best[0],)) + best[1]
+
+
+def decode_chunk(record, baseline=None):
+    """Decode a record produced by encode_chunk.
+
+    Args:
+        record (bytes-like): Format byte followed by the payload.
+        baseline (callable): Returns the generated chunk; only called for FORMAT_DELTA.
+
+    Raises:
+        ValueError: Unknown format byte, a truncated or malformed payload,
+            a payload of the wrong size, or a FORMAT_DELTA record without a
+            baseline.
+    """
+    if not record:
+        raise ValueError("empty chunk record")
+    fmt = record[0]
+    payload = record[1:]
+    if fmt == FORMAT_RAW:
+        tiles = payload
+    elif fmt == FORMAT_RLE:
+        tiles = rle_decode(payload)
+    elif fmt == FORMAT_RLE_ZLIB:
+        try:
+            tiles = rle_decode(zlib.decompress(payload))
+        except zlib.error as e:
+            raise ValueError(f"corrupt compressed chunk: {e}") from e
+    elif fmt == FORMAT_DELTA:
+        if baseline is None:
+            raise ValueError("cannot apply chunk delta without a baseline")
+        tiles = delta_apply(payload, baseline())
+    else:
+        raise ValueError(f"unknown chunk format {fmt}")
+    if len(tiles) != CHUNK_AREA:
+        raise ValueError(f"chunk decodes to {len(tiles)} tiles, expected {CHUNK_AREA}")
+    return tiles
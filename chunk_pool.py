@@ -0,0 +1,98 @@
+# Background chunk generation in worker processes.
+# Chunk generation is pure CPU work, so ChunkPool runs it on a few worker
+# processes ahead of the player and hands back immutable bytes that World
+# installs as they are. Workers are started with the "spawn" method: forking a
+# process that runs pygame and the chunk saver thread is not safe. Spawned
+# workers import the launching script again, so it must keep its work behind
+# an if __name__ == "__main__" guard, as main.py does.
+
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import multiprocessing
+from constants import GENERATION_WORKERS
+
+
+class ChunkPool:
+    """Generates chunks in a process pool before they are needed.
+
+    generate must be a picklable top-level function (seed, cx, cy) -> bytes.
+    Finished chunks wait in results until World takes them; pending work
+    for chunks that are no longer wanted is cancelled by retain().
+    """
+
+    def __init__(self, generate, seed, workers=GENERATION_WORKERS):
+        self.generate = generate
+        self.seed = seed
+        self.workers = workers if workers is not None else os.cpu_count() or 1
+        self.executor = None  # Started on first request
+        self.futures = {}  # Dictionary: {(cx, cy): Future}
+        self.results = {}  # Dictionary: {(cx, cy): generated chunk bytes}
+        self.lock = threading.Lock()  # Results arrive on the executor's manager thread
+
+    def request(self, keys):
+        # Queue generation of chunks that are neither finished nor in flight.
+        if not self.workers:
+            return
+        for key in keys:
+            if key in self.futures or key in self.results:
+                continue
+            try:
+                if self.executor is None:
+                    context = multiprocessing.get_context("spawn")
+                    self.executor = ProcessPoolExecutor(self.workers, mp_context=context)
+                future = self.executor.submit(self.generate, self.seed, *key)
+            except (BrokenProcessPool, RuntimeError, OSError) as e:
+                print(f"Warning: Chunk generation pool unavailable, generating on the main thread: {e}")
+                self.close()
+                self.workers = 0
+                return
+            self.futures[key] = future
+            future.add_done_callback(lambda future, key=key: self._done(key, future))
+
+    def _done(self, key, future):
+        # Runs however the future ended, so a chunk that failed is freed to be requested again.
+        data = None
+        if not future.cancelled():
+            try:
+                data = future.result()
+            except Exception as e:
+                print(f"Error generating chunk {key} in worker: {e}")
+        with self.lock:
+            if self.futures.get(key) is future:
+                del self.futures[key]
+                if data is not None:
+                    self.results[key] = data
+
+    def take(self, key):
+        """Return a finished chunk and forget it, or None if it is not ready.
+
+        A chunk still in flight is cancelled: the caller is about to
+        generate it inline, so waiting would only add latency.
+        """
+        with self.lock:
+            data = self.results.pop(key, None)
+            future = self.futures.pop(key, None)
+        if future is not None:
+            future.cancel()
+        return data
+
+    def retain(self, keys):
+        # Drop finished and pending chunks outside keys.
+        with self.lock:
+            stale = [key for key in self.futures if key not in keys]
+            futures = [self.futures.pop(key) for key in stale]
+            for key in [key for key in self.results if key not in keys]:
+                del self.results[key]
+        for future in futures:
+            future.cancel()
+
+    def close(self):
+        if self.executor is not None:
+            # Wait for the workers to exit, so none is left behind holding a pipe
+            self.executor.shutdown(wait=True, cancel_futures=True)
+            self.executor = None
+        with self.lock:
+            self.futures.clear()
+            self.results.clear()
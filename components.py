@@ -0,0 +1,88 @@
+# Chunk-attached storage for per-tile game state.
+# Turret levels, wall damage, tree growth and the like are sparse values keyed
+# by tile. ComponentTable keeps them with the chunk that holds the tile, so they
+# load, save and evict together with it and memory follows the loaded area.
+
+from collections.abc import MutableMapping
+from constants import CHUNK_SIZE
+
+
+class ComponentTable(MutableMapping):
+    """Per-tile values of one component, stored with their chunks.
+
+    Behaves like a dict keyed by integer world (x, y). Entries live in
+    World.chunk_components[(cx, cy)][name][tile index], so a lookup is two
+    small dict lookups inside one chunk instead of a hash into a table of
+    every tile in the world. Iteration only sees loaded chunks; reading or
+    writing a tile loads its chunk like get_tile does.
+
+    Values changed in place are not noticed: assign them back to have the
+    chunk's components saved.
+    """
+
+    def __init__(self, world, name):
+        self.world = world
+        self.name = name
+
+    def _locate(self, pos):
+        x, y = int(pos[0]), int(pos[1])
+        cx = x // CHUNK_SIZE
+        cy = y // CHUNK_SIZE
+        if (cx, cy) not in self.world.chunks:
+            self.world.ensure_chunk(cx, cy)
+        return (cx, cy), (y - cy * CHUNK_SIZE) * CHUNK_SIZE + x - cx * CHUNK_SIZE
+
+    def _cell(self, key):
+        components = self.world.chunk_components.get(key)
+        return components.get(self.name) if components else None
+
+    def __getitem__(self, pos):
+        key, index = self._locate(pos)
+        cell = self._cell(key)
+        if cell is None or index not in cell:
+            raise KeyError(pos)
+        return cell[index]
+
+    def get(self, pos, default=None):
+        key, index = self._locate(pos)
+        cell = self._cell(key)
+        return default if cell is None else cell.get(index, default)
+
+    def __contains__(self, pos):
+        key, index = self._locate(pos)
+        cell = self._cell(key)
+        return cell is not None and index in cell
+
+    def __setitem__(self, pos, value):
+        key, index = self._locate(pos)
+        components = self.world.chunk_components.setdefault(key, {})
+        components.setdefault(self.name, {})[index] = value
+        self.world.component_dirty.add(key)
+
+    def __delitem__(self, pos):
+        key, index = self._locate(pos)
+        cell = self._cell(key)
+        if cell is None or index not in cell:
+            raise KeyError(pos)
+        del cell[index]
+        if not cell:
+            components = self.world.chunk_components[key]
+            del components[self.name]
+            if not components:
+                del self.world.chunk_components[key]
+        self.world.component_dirty.add(key)
+
+    def __iter__(self):
+        # Snapshot the keys so callers may change the table while iterating.
+        return iter([pos for key in list(self.world.chunk_components) for pos, _ in self.chunk_items(*key)])
+
+    def __len__(self):
+        return sum(len(components.get(self.name, ())) for components in self.world.chunk_components.values())
+
+    def chunk_items(self, cx, cy):
+        """List ((x, y), value) pairs for one loaded chunk."""
+        cell = self._cell((cx, cy))
+        if not cell:
+            return []
+        left, top = cx * CHUNK_SIZE, cy * CHUNK_SIZE
+        return [((left + i % CHUNK_SIZE, top + i // CHUNK_SIZE), value) for i, value in cell.items()]
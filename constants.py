@@ -6,14 +6,21 @@ import pygame
 from enum import IntEnum
 
 # --- Paths ---
-CHUNK_DIR = "chunks"  # Directory for storing chunk data files
+CHUNK_DIR = "chunks"  # Directory holding one subdirectory per world save slot
+SEED_FILE = "world.seed"  # World seed, stored in each save slot next to the region files
+GENERATOR_FILE = "world.generator"  # Fingerprint of the chunk generator a slot's delta records were made against
+CLOCK_FILE = "world.clock"  # Game time the world has reached in milliseconds, stored in each save slot
+WORLD_SLOT = None  # Save slot under CHUNK_DIR to resume (or create), or None for a fresh world each start
+KEEP_AUTO_SLOTS = 2  # Unnamed worlds from earlier sessions kept before they are deleted in the background
 
 # --- Chunk generation settings ---
+WORLD_SEED = None  # Fixed seed for new worlds, or None for a random seed each time
 # Less overall land to give more water between islands
 LAND_FRACTION = 0.1  # 10% of chunk tiles are land
-# Larger island masses for more interesting terrain
-MIN_LAND_MASS_SIZE = 16
-MAX_LAND_MASS_SIZE = 40
+# Islands are the high ground of a seamless noise field; a larger period gives larger islands
+ISLAND_NOISE_PERIOD = 12  # Tiles between elevation lattice points
+BIOME_NOISE_PERIOD = 6  # Chunks between biome lattice points
+BIOME_BLEND = 0.05  # Biome noise rank either side of a biome border over which land fractions are blended
 TREE_CHANCE = 0.2
 LOOT_CHANCE = 0.05
 BOULDER_CHANCE = 0.03
@@ -21,7 +28,12 @@ STARTING_AREA_LAND_MIN = 10
 STARTING_AREA_LAND_MAX = 16
 STARTING_AREA_FEATURES_MIN = 1
 STARTING_AREA_FEATURES_MAX = 3
-SAVE_CHUNK_INTERVAL = 5000
+SAVE_CHUNK_INTERVAL = 30000  # Milliseconds between tile journal compactions
+JOURNAL_FLUSH_BYTES = 64 * 1024  # Buffered journal bytes that force a write mid-frame
+JOURNAL_COMPACT_BYTES = 1024 * 1024  # Journal segment size that triggers an early compaction
+REGION_SIZE = 32  # Chunks per region file side (32x32 chunks share one file)
+SAVE_QUEUE_SIZE = 256  # Chunk snapshots the background saver may fall behind by
+CHUNK_ZLIB_LEVEL = 6  # zlib level for run-length encoded chunk records (0 disables zlib)
 
 # --- Scale Settings ---
 SCALE = 2  # Current scaling factor for game rendering (pixels per tile)
@@ -205,6 +217,7 @@ KRAKEN_DESPAWN_DELAY = 2000  # Time before despawning if no boat tiles found (mi
 # Timing constants for animations, spawning, and game mechanics (in milliseconds unless specified).
 WATER_FRAME_DELAY = 1200  # Delay between water animation frames
 FISH_SPAWN_INTERVAL = 1000  # Interval for spawning fish tiles
+FISH_SPAWN_TRIES = 32  # Random view tiles tried per fish spawn before giving up
 FISH_DESPAWN_TIME = 60000  # Time before fish tiles despawn
 SAPLING_GROWTH_TIME = 30000  # Time for saplings to grow into trees
 LAND_SPREAD_TIME = 30000  # Time for boat tiles to convert to land
@@ -220,7 +233,16 @@ MUSIC_VOLUME = 0.5  # Music volume level (0.0 to 1.0)
 # --- Game Mechanics ---
 # Constants controlling core gameplay mechanics and balance.
 CHUNK_SIZE = 16  # Size of each chunk in tiles (16x16)
+CHUNK_AREA = CHUNK_SIZE * CHUNK_SIZE  # Tiles per chunk, stored row-major in one bytearray
 VIEW_CHUNKS = 5  # Number of chunks loaded around the player (5x5 grid)
+CHUNK_HYSTERESIS = 1  # Chunks beyond VIEW_CHUNKS a loaded chunk may drift before it is evicted
+WARM_CACHE_BYTES = 2 * 1024 * 1024  # Bytes of recently evicted chunks kept in memory
+WARM_ENTRY_BYTES = 256  # Charged per evicted chunk on top of its tiles, so open water still fills the cache
+GENERATION_RING = 2  # Chunks beyond VIEW_CHUNKS generated ahead of time in worker processes (0 disables)
+GENERATION_WORKERS = 2  # Worker processes for chunk generation; each one imports pygame, so keep it small
+MAP_LEVELS = 6  # World map zoom levels; a cell at the top level covers 32x32 chunks
+PREFETCH_LOOKAHEAD = 120  # Frames of movement projected ahead when prefetching chunks
+PREFETCH_CHUNKS_PER_FRAME = 1  # Chunks loaded or generated per frame by the prefetcher
 TURRET_RANGE = 4  # Range of turret attacks in tiles
 PIRATE_MAGE_RANGE = 12  # Range that pirate mages can cast fireballs
 TURRET_MAX_LEVEL = 99  # Maximum level for turret upgrades
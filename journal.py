@@ -0,0 +1,92 @@
+# Append-only journal of tile changes.
+# Every set_tile appends a fixed-size (x, y, old, new, tick) record, so a change
+# costs RECORD.size bytes of sequential I/O instead of a chunk rewrite.
+# The journal is split into numbered segments: compaction starts a new segment,
+# folds the dirty chunks into the region store and deletes the old segment
+# once those writes have landed. Segments still on disk after a crash are
+# replayed on top of the region store.
+
+import os
+import re
+import struct
+from constants import JOURNAL_FLUSH_BYTES
+
+RECORD = struct.Struct("<iiBBI")  # x, y, old tile, new tile, tick
+SEGMENT = re.compile(r"journal\.(\d+)\.log$")
+
+
+class TileJournal:
+    """Buffered writer for journal segments in a directory."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.buffer = bytearray()  # Records not yet handed to the OS
+        self.file = None  # Current segment, opened on first write
+        self.number = None
+        self.size = 0  # Bytes appended to the current segment
+
+    def segment_path(self, number):
+        return os.path.join(self.directory, f"journal.{number}.log")
+
+    def segments(self):
+        # Numbers of the segments on disk, oldest first.
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return []
+        return sorted(int(m.group(1)) for m in map(SEGMENT.match, names) if m)
+
+    def append(self, x, y, old, new, tick):
+        self.buffer += RECORD.pack(x, y, old, new, tick & 0xFFFFFFFF)
+        if len(self.buffer) >= JOURNAL_FLUSH_BYTES:
+            self.flush()
+
+    def flush(self):
+        """Write buffered records to the current segment.
+
+        Once written, records survive the game process crashing; call once
+        per frame so at most a frame of changes can be lost.
+        """
+        if not self.buffer:
+            return
+        if self.file is None:
+            existing = self.segments()
+            self.number = existing[-1] + 1 if existing else 0
+            self.file = open(self.segment_path(self.number), "ab")
+            self.size = 0
+        self.file.write(self.buffer)
+        self.file.flush()
+        self.size += len(self.buffer)
+        self.buffer.clear()
+
+    def rotate(self):
+        """Close the current segment so later records go to a new one.
+
+        Returns:
+            str: Path of the closed segment, or None if nothing was written.
+        """
+        self.flush()
+        if self.file is None:
+            return None
+        self.file.close()
+        self.file = None
+        return self.segment_path(self.number)
+
+    def read(self, number):
+        # Yield the complete records of a segment; a torn final record is ignored.
+        try:
+            with open(self.segment_path(number), "rb") as f:
+                data = f.read()
+        except OSError as e:
+            print(f"Error reading tile journal segment {number}: {e}")
+            return
+        yield from RECORD.iter_unpack(data[:len(data) - len(data) % RECORD.size])
+
+    def discard(self, path):
+        try:
+            os.remove(path)
+        except OSError as e:
+            print(f"Warning: Could not delete journal segment {path}: {e}")
+
+    def close(self):
+        self.rotate()
@@ -454,10 +454,11 @@ class NPCManager:
                         landing_tile = (sx, sy)
                         break
                 if landed:
-                    for s in npc.ship:
-                        sx, sy = int(round(s["x"])), int(round(s["y"]))
-                        if world.get_tile(sx, sy) == Tile.WATER:
-                            world.set_tile(sx, sy, Tile.BOAT)
+                    world.set_tiles(
+                        (sx, sy, Tile.BOAT)
+                        for sx, sy in ((int(round(s["x"])), int(round(s["y"]))) for s in npc.ship)
+                        if world.get_tile(sx, sy) == Tile.WATER
+                    )
                     npc.ship = [{"x": landing_tile[0], "y": landing_tile[1]}]
                     npc.state = "docked"
                     npc.x, npc.y = landing_tile
@@ -0,0 +1,153 @@
+# Offline world pregeneration and inspection.
+# Generates a square or disk of chunks around the origin for a seed on every
+# core and writes them into a save slot, then prints what was made: land
+# fraction per biome, resource counts, file sizes and throughput.
+# Pregenerated chunks are stored without a delta baseline, so the game loads
+# them by decoding the record instead of running the generator again.
+# Usage: py pregen.py --slot warm --seed 42 --radius 32 [--shape disk] [--workers 8]
+# then set WORLD_SLOT = "warm" in constants.py to play the pregenerated world.
+
+import argparse
+import multiprocessing
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from constants import *
+from world import World, TILES, generate_chunk_block
+from chunk_codec import encode_chunk
+from save_slots import slot_path, list_slots, create_slot, remove_slot
+
+BATCH_SIZE = 8  # Chunks per side of the block each worker task generates in one noise pass
+
+
+def chunk_keys(radius, shape):
+    # Chunks within radius of the origin chunk.
+    keys = [(cx, cy) for cx in range(-radius, radius + 1) for cy in range(-radius, radius + 1)]
+    if shape == "disk":
+        keys = [(cx, cy) for cx, cy in keys if cx * cx + cy * cy <= radius * radius]
+    return keys
+
+
+def chunk_batches(keys):
+    """Group chunk keys into BATCH_SIZE x BATCH_SIZE blocks.
+
+    Blocks nearest the origin come first, so an interrupted run leaves a
+    usable core.
+
+    Returns:
+        list: (block x, block y, set of keys) per block.
+    """
+    blocks = {}
+    for cx, cy in keys:
+        blocks.setdefault((cx // BATCH_SIZE, cy // BATCH_SIZE), set()).add((cx, cy))
+    order = sorted(blocks, key=lambda block: (block[0] + 0.5) ** 2 + (block[1] + 0.5) ** 2)
+    return [(bx, by, blocks[(bx, by)]) for bx, by in order]
+
+
+def pregenerate_batch(seed, bx, by, keys):
+    """Generate and encode one block of chunks in a worker process.
+
+    Returns:
+        tuple: List of (cx, cy, biome name, record, tile counts) for the chunks
+        in keys, and the seconds spent generating.
+    """
+    start = time.perf_counter()
+    chunks = generate_chunk_block(seed, bx * BATCH_SIZE, by * BATCH_SIZE, BATCH_SIZE, BATCH_SIZE)
+    seconds = time.perf_counter() - start
+    results = []
+    for (cx, cy), (name, tiles) in chunks.items():
+        if (cx, cy) in keys:
+            counts = np.bincount(np.frombuffer(tiles, dtype=np.uint8), minlength=len(TILES))
+            results.append((cx, cy, name, encode_chunk(tiles), counts))
+    # Chunks of a partial block outside the area were generated too; charge only the share kept
+    return results, seconds * len(keys) / len(chunks)
+
+
+def pregenerate(seed, slot, radius, shape="square", workers=None):
+    """Write a fresh world into a save slot with every chunk in the area pregenerated.
+
+    A slot of the same name is replaced. Records are written from this
+    process as workers finish their batches.
+
+    Returns:
+        dict: Statistics for print_stats().
+    """
+    keys = chunk_keys(radius, shape)
+    workers = workers or os.cpu_count() or 1
+    if slot in list_slots():
+        remove_slot(slot)
+    world = World(seed, slot_path(create_slot(slot)))
+    world.save_seed()
+    stats = {"chunks": len(keys), "workers": workers, "generate_seconds": 0.0,
+             "record_bytes": 0, "biomes": {}, "tiles": np.zeros(len(TILES), dtype=np.int64)}
+    batches = chunk_batches(keys)
+    start = time.perf_counter()
+    context = multiprocessing.get_context("spawn")  # Same start method as the game's ChunkPool
+    with ProcessPoolExecutor(workers, mp_context=context) as executor:
+        futures = [executor.submit(pregenerate_batch, seed, *batch) for batch in batches]
+        for future in futures:
+            results, seconds = future.result()
+            stats["generate_seconds"] += seconds
+            for cx, cy, name, record, counts in results:
+                world.store.write(cx, cy, record)
+                biome = stats["biomes"].setdefault(name, {"chunks": 0, "land": 0})
+                biome["chunks"] += 1
+                biome["land"] += CHUNK_AREA - int(counts[Tile.WATER])
+                stats["tiles"] += counts
+                stats["record_bytes"] += len(record)
+    stats["seconds"] = time.perf_counter() - start
+    # The starting island is part of every new world
+    world.initialize_starting_area()
+    world.close()
+    return stats
+
+
+def directory_sizes(directory):
+    # Bytes per kind of file in a slot: region files, component files, journal segments.
+    sizes = {}
+    for filename in os.listdir(directory):
+        path = os.path.join(directory, filename)
+        if os.path.isfile(path):
+            kind = filename.rsplit(".", 1)[-1]
+            count, total = sizes.get(kind, (0, 0))
+            sizes[kind] = (count + 1, total + os.path.getsize(path))
+    return sizes
+
+
+def print_stats(stats, directory):
+    chunks = stats["chunks"]
+    print(f"{chunks} chunks in {stats['seconds']:.2f} s on {stats['workers']} workers: "
+          f"{chunks / stats['seconds']:.0f} chunks/s "
+          f"({chunks / stats['generate_seconds']:.0f} chunks/s per core generating)")
+    print("land fraction by biome")
+    for name, biome in sorted(stats["biomes"].items()):
+        fraction = biome["land"] / (biome["chunks"] * CHUNK_AREA)
+        print(f"  {name:<10} {biome['chunks']:7d} chunks   {fraction:6.2%} land")
+    print("tiles")
+    for tile in TILES:
+        count = int(stats["tiles"][tile])
+        if count and tile != Tile.WATER:
+            print(f"  {tile.name:<10} {count:9d}   {count / chunks:6.2f}/chunk")
+    print("files")
+    for kind, (count, size) in sorted(directory_sizes(directory).items()):
+        print(f"  {kind:<10} {count:5d} files   {size / 1024:9.1f} KiB")
+    print(f"  records    {stats['record_bytes'] / chunks:6.1f} B/chunk on average")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pregenerate a world into the chunk store and print its statistics.")
+    parser.add_argument("--slot", default="pregen", help="save slot to write; play it with WORLD_SLOT")
+    parser.add_argument("--seed", type=int, default=WORLD_SEED, help="world seed (default WORLD_SEED, else random)")
+    parser.add_argument("--radius", type=int, default=16, help="chunks from the origin chunk to generate")
+    parser.add_argument("--shape", choices=("square", "disk"), default="square")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    args = parser.parse_args()
+    seed = args.seed if args.seed is not None else random.getrandbits(32)
+    print(f"seed {seed}, {args.shape} of radius {args.radius} chunks into slot {args.slot}")
+    print_stats(pregenerate(seed, args.slot, args.radius, args.shape, args.workers), slot_path(args.slot))
+
+
+if __name__ == "__main__":
+    main()
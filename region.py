@@ -0,0 +1,251 @@
+# Region file storage for chunk data.
+# Packs REGION_SIZE x REGION_SIZE chunks into a single file with a header table
+# of (offset, length, capacity) entries, so a chunk is read or written with one seek.
+# A record that outgrows its slot moves; the space it leaves is reused by later
+# records, and free space at the end of the file is cut off when it is closed.
+# Subclasses of RegionStore can key other records by region the same way.
+# ChunkSaver persists chunk snapshots on a background thread (write-behind).
+# Callbacks queued with ChunkSaver.call run in order with the writes.
+
+import bisect
+import os
+import queue
+import struct
+import threading
+from constants import REGION_SIZE, SAVE_QUEUE_SIZE
+
+ENTRY = struct.Struct("<III")  # offset, length, capacity of one chunk record
+REGION_CHUNKS = REGION_SIZE * REGION_SIZE
+
+
+class RegionFile:
+    """One open region file and its in-memory copy of the header table."""
+
+    def __init__(self, path, records=REGION_CHUNKS):
+        self.path = path
+        header_size = ENTRY.size * records
+        exists = os.path.exists(path)
+        self.file = open(path, "r+b" if exists else "w+b")
+        header = self.file.read(header_size) if exists else b""
+        if len(header) < header_size:
+            # New (or truncated) region: start with an empty table
+            header = bytes(header_size)
+            self.file.seek(0)
+            self.file.write(header)
+        self.entries = [ENTRY.unpack_from(header, i * ENTRY.size) for i in range(records)]
+        # Gaps between the records' slots, sorted by offset; writes fill them before growing the file
+        self.free = []
+        self.end = header_size  # End of the last slot, where the file grows from
+        for offset, _, capacity in sorted((offset, length, capacity) for offset, length, capacity in self.entries if capacity):
+            if offset > self.end:
+                self.free.append((self.end, offset - self.end))
+            self.end = max(self.end, offset + capacity)
+
+    def read(self, index):
+        offset, length, _ = self.entries[index]
+        if not length:
+            return None
+        self.file.seek(offset)
+        return self.file.read(length)
+
+    def write(self, index, data):
+        old_offset, _, old_capacity = self.entries[index]
+        offset, capacity = old_offset, old_capacity
+        length = len(data)
+        if length > capacity:
+            # Record outgrew its slot: move it to free space, or the end of the file
+            offset, capacity = self._allocate(length), length
+        self.file.seek(offset)
+        self.file.write(data)
+        self.entries[index] = (offset, length, capacity)
+        self.file.seek(index * ENTRY.size)
+        self.file.write(ENTRY.pack(offset, length, capacity))
+        if offset != old_offset and old_capacity:
+            # Only once the header points at the new copy
+            self._release(old_offset, old_capacity)
+
+    def _allocate(self, size):
+        # Offset of size bytes of free space: the first gap that fits, else the end of the file.
+        for i, (offset, gap) in enumerate(self.free):
+            if gap >= size:
+                if gap == size:
+                    del self.free[i]
+                else:
+                    self.free[i] = (offset + size, gap - size)
+                return offset
+        offset = self.end
+        self.end += size
+        return offset
+
+    def _release(self, offset, size):
+        # Return a slot to the free space, merging it with the gaps on either side.
+        i = bisect.bisect(self.free, (offset, size))
+        if i < len(self.free) and self.free[i][0] == offset + size:
+            size += self.free.pop(i)[1]
+        if i and sum(self.free[i - 1]) == offset:
+            i -= 1
+            offset, gap = self.free.pop(i)
+            size += gap
+        if offset + size == self.end:
+            self.end = offset
+        else:
+            self.free.insert(i, (offset, size))
+
+    def flush(self):
+        self.file.flush()
+
+    def sync(self):
+        # Flush and force the data onto the disk, so it survives the process or the machine dying.
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def close(self):
+        # Drop free space past the last slot, left by records that moved
+        self.file.seek(0, os.SEEK_END)
+        if self.file.tell() > self.end:
+            self.file.truncate(self.end)
+        self.file.close()
+
+
+class RegionStore:
+    """Chunk record storage backed by region files in a directory.
+
+    Records are opaque bytes keyed by chunk coordinates; region files are
+    opened lazily and kept open so chunk reads skip file-open latency.
+    Subclasses can store other records with read_record() and
+    write_record(), setting records to the header entries they need.
+    """
+
+    records = REGION_CHUNKS  # Header entries per region file
+
+    def __init__(self, directory, extension="region"):
+        self.directory = directory
+        self.extension = extension  # Lets several stores share a directory
+        self.regions = {}  # Dictionary: {(rx, ry): RegionFile}
+        self.lock = threading.RLock()  # Region files are shared with the saver thread
+
+    def region_path(self, rx, ry):
+        return os.path.join(self.directory, f"r.{rx}.{ry}.{self.extension}")
+
+    def slot(self, cx, cy):
+        # (region key, header index) of a chunk's record.
+        return (cx // REGION_SIZE, cy // REGION_SIZE), (cy % REGION_SIZE) * REGION_SIZE + (cx % REGION_SIZE)
+
+    def _region(self, key, create):
+        region = self.regions.get(key)
+        if region is None:
+            path = self.region_path(*key)
+            if not create and not os.path.exists(path):
+                return None
+            region = self.regions[key] = RegionFile(path, self.records)
+        return region
+
+    def read(self, cx, cy):
+        return self.read_record(*self.slot(cx, cy))
+
+    def write(self, cx, cy, data):
+        self.write_record(*self.slot(cx, cy), data)
+
+    def read_record(self, key, index):
+        # Record at a header index of region key, or None.
+        with self.lock:
+            region = self._region(key, create=False)
+            if region is None:
+                return None
+            return region.read(index)
+
+    def write_record(self, key, index, data):
+        with self.lock:
+            self._region(key, create=True).write(index, data)
+
+    def flush(self):
+        with self.lock:
+            for region in self.regions.values():
+                region.flush()
+
+    def sync(self):
+        with self.lock:
+            for region in self.regions.values():
+                region.sync()
+
+    def close(self):
+        with self.lock:
+            for region in self.regions.values():
+                region.close()
+            self.regions.clear()
+
+
+class ChunkSaver:
+    """Write-behind worker that persists chunk snapshots off the game thread.
+
+    Snapshots are immutable bytes queued on a bounded queue; submit() blocks
+    when the worker falls SAVE_QUEUE_SIZE records behind. The worker calls
+    encode(cx, cy, snapshot) to build each record it writes. Snapshots still in flight are
+    served by read() so a chunk reloaded before its write lands is never stale.
+    """
+
+    def __init__(self, store, encode=lambda cx, cy, data: data, maxsize=SAVE_QUEUE_SIZE):
+        self.store = store
+        self.encode = encode
+        self.queue = queue.Queue(maxsize)
+        self.pending = {}  # Dictionary: {(cx, cy): latest snapshot not yet written}
+        self.lock = threading.Lock()
+        self.thread = threading.Thread(target=self._run, name="chunk-saver", daemon=True)
+        self.thread.start()
+
+    def submit(self, cx, cy, data):
+        if not self.thread.is_alive():
+            # Saver already closed: fall back to a synchronous write
+            self.store.write(cx, cy, self.encode(cx, cy, data))
+            return
+        with self.lock:
+            self.pending[(cx, cy)] = data
+        self.queue.put((cx, cy, data))
+
+    def read(self, cx, cy):
+        with self.lock:
+            return self.pending.get((cx, cy))
+
+    def call(self, callback):
+        # Run callback on the saver thread once every snapshot submitted so far is written.
+        if not self.thread.is_alive():
+            callback()
+            return
+        self.queue.put(callback)
+
+    def flush(self):
+        # Barrier: wait until every submitted snapshot has reached the store.
+        self.queue.join()
+        self.store.flush()
+
+    def close(self):
+        if not self.thread.is_alive():
+            return
+        self.flush()
+        self.queue.put(None)
+        self.thread.join()
+
+    def _run(self):
+        while True:
+            item = self.queue.get()
+            try:
+                if item is None:
+                    return
+                if callable(item):
+                    try:
+                        item()
+                    except Exception as e:
+                        # Keep the thread alive: flush() and close() wait on every queued item
+                        print(f"Error in queued save callback: {e}")
+                    continue
+                cx, cy, data = item
+                try:
+                    self.store.write(cx, cy, self.encode(cx, cy, data))
+                except Exception as e:
+                    print(f"Error saving chunk ({cx}, {cy}): {e}")
+                finally:
+                    with self.lock:
+                        if self.pending.get((cx, cy)) is data:
+                            del self.pending[(cx, cy)]
+            finally:
+                self.queue.task_done()
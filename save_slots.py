@@ -0,0 +1,150 @@
+# Named world save slots.
+# Every world lives in its own directory under CHUNK_DIR, so starting a fresh
+# world is one mkdir however many files the last one left behind. Unwanted
+# slots are renamed out of the way, which is instant, and deleted on a
+# background thread. Slots started without a name are called auto-<time> and
+# pruned automatically; named slots are only removed on request.
+
+import os
+import re
+import shutil
+import threading
+import time
+from constants import CHUNK_DIR, SEED_FILE, GENERATOR_FILE, KEEP_AUTO_SLOTS
+
+AUTO_PREFIX = "auto-"  # Slots named by create_slot(); the only ones prune_slots() removes
+TRASH_PREFIX = ".trash-"  # Slots renamed for deletion; removed by the cleaner thread
+# World files written straight into CHUNK_DIR before it held slots
+LEGACY_FILE = re.compile(r"(r\.-?\d+\.-?\d+\.\w+|journal\.\d+\.log|chunk_.*\.pkl|" + re.escape(SEED_FILE) + ")$")
+
+
+def slot_path(name, root=CHUNK_DIR):
+    return os.path.join(root, name)
+
+
+def list_slots(root=CHUNK_DIR):
+    # Slot names under root, oldest auto slot first (their names sort by creation time).
+    try:
+        names = os.listdir(root)
+    except OSError:
+        return []
+    return sorted(name for name in names
+                  if not name.startswith(TRASH_PREFIX) and os.path.isdir(os.path.join(root, name)))
+
+
+def read_seed(name, root=CHUNK_DIR):
+    """Return the seed stored in a slot, or None if the slot holds no world."""
+    try:
+        with open(os.path.join(slot_path(name, root), SEED_FILE)) as f:
+            return int(f.read())
+    except (OSError, ValueError):
+        return None
+
+
+def read_fingerprint(name, root=CHUNK_DIR):
+    # Generator fingerprint stored in a slot, or None if it has none (made before fingerprints).
+    try:
+        with open(os.path.join(slot_path(name, root), GENERATOR_FILE)) as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def create_slot(name=None, root=CHUNK_DIR):
+    """Create an empty slot directory.
+
+    Args:
+        name (str): Slot name, or None for a new auto-<time> slot.
+
+    Returns:
+        str: Name of the slot created.
+    """
+    if name is None:
+        base = AUTO_PREFIX + time.strftime("%Y%m%d-%H%M%S")
+        name, suffix = base, 1
+        while os.path.exists(slot_path(name, root)):
+            suffix += 1
+            name = f"{base}-{suffix}"
+    os.makedirs(slot_path(name, root), exist_ok=True)
+    return name
+
+
+def open_slot(name=None, root=CHUNK_DIR, fingerprint=None):
+    """Find or create the slot for this session.
+
+    A named slot that already holds a world is resumed; any other name,
+    or None, gets a fresh directory. If fingerprint is given, a slot saved
+    by a different generator is not resumed: its chunk deltas would be
+    applied to the wrong baseline. It is left untouched and the session
+    gets a fresh auto slot instead.
+
+    Args:
+        name (str): Slot to resume, or None for a new auto slot.
+        fingerprint (str): world.generator_fingerprint() of this build, or None to skip the check.
+
+    Returns:
+        tuple: (slot name, slot directory, stored seed or None for a fresh world).
+    """
+    if name is not None:
+        seed = read_seed(name, root)
+        if seed is not None:
+            if fingerprint is None or read_fingerprint(name, root) == fingerprint:
+                return name, slot_path(name, root), seed
+            print(f"Warning: Save slot {name} was made by a different world generator; starting a new world instead")
+            name = None
+    name = create_slot(name, root)
+    return name, slot_path(name, root), None
+
+
+def trash_slot(name, root=CHUNK_DIR):
+    # Rename a slot out of the way for empty_trash(); instant whatever its size.
+    trash = os.path.join(root, f"{TRASH_PREFIX}{name}-{time.monotonic_ns()}")
+    try:
+        os.rename(slot_path(name, root), trash)
+    except OSError as e:
+        print(f"Warning: Could not remove save slot {name}: {e}")
+
+
+def remove_slot(name, root=CHUNK_DIR, wait=False):
+    """Delete a slot.
+
+    The directory is renamed away at once, so the name is free and the
+    slot is gone from list_slots(); its files are deleted on a background
+    thread unless wait is True.
+    """
+    trash_slot(name, root)
+    if wait:
+        empty_trash(root)
+    else:
+        start_cleaner(root)
+
+
+def prune_slots(keep=KEEP_AUTO_SLOTS, exclude=(), root=CHUNK_DIR):
+    # Remove all but the newest keep auto slots not in exclude, in the background.
+    auto = [name for name in list_slots(root) if name.startswith(AUTO_PREFIX) and name not in exclude]
+    for name in auto[:max(len(auto) - keep, 0)]:
+        trash_slot(name, root)
+    # Also finishes trash left by a session that exited before its cleaner did
+    start_cleaner(root)
+
+
+def empty_trash(root=CHUNK_DIR):
+    # Delete trashed slots and world files left in root by versions without slots.
+    try:
+        names = os.listdir(root)
+    except OSError:
+        return
+    for name in names:
+        path = os.path.join(root, name)
+        if name.startswith(TRASH_PREFIX):
+            shutil.rmtree(path, ignore_errors=True)
+        elif LEGACY_FILE.match(name) and os.path.isfile(path):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+def start_cleaner(root=CHUNK_DIR):
+    # Delete trashed slots on a daemon thread; whatever an exit interrupts is finished next time.
+    threading.Thread(target=empty_trash, args=(root,), name="slot-cleaner", daemon=True).start()
@@ -0,0 +1,140 @@
+# Seamless coherent noise for world generation.
+# Value noise: pseudo-random values on an integer lattice, hashed from the seed
+# and the lattice coordinates alone, smoothly interpolated in between. Any
+# rectangle of the world can be evaluated on its own and adjacent rectangles
+# agree exactly where they meet, so what is drawn from the noise continues
+# across chunk borders. Whole rectangles are computed with NumPy row and
+# column operations; there is no per-tile Python.
+
+from functools import lru_cache
+import numpy as np
+
+MASK64 = (1 << 64) - 1
+OCTAVES = 3  # Layers of detail in fractal_noise, each at half the period of the last
+PERSISTENCE = 0.5  # Weight of each octave relative to the previous one
+# Hash constants as NumPy scalars, so the per-call arithmetic stays in uint64
+MIX_X, MIX_Y = np.uint64(0xD6E8FEB86659FD93), np.uint64(0xA0761D6478BD642F)
+MIX_1, MIX_2 = np.uint64(0xBF58476D1CE4E5B9), np.uint64(0x94D049BB133111EB)
+SHIFT_11, SHIFT_27, SHIFT_30, SHIFT_31 = np.uint64(11), np.uint64(27), np.uint64(30), np.uint64(31)
+CALIBRATION_SAMPLES = 1 << 16  # Random points the quantiles of each noise period are estimated from
+
+
+def lattice_values(seed, ix, iy):
+    """Hash integer lattice coordinates to uniform floats in [0, 1).
+
+    ix and iy are int64 arrays that broadcast against each other. Mixing
+    follows splitmix64, so nearby points get unrelated values. uint64
+    array arithmetic wraps silently, which is what the hash wants.
+    """
+    salt = np.uint64((seed * 0x9E3779B97F4A7C15 + 0x632BE59BD9B4E019) & MASK64)
+    h = (ix.astype(np.uint64) * MIX_X) ^ (iy.astype(np.uint64) * MIX_Y) ^ salt
+    h ^= h >> SHIFT_30
+    h *= MIX_1
+    h ^= h >> SHIFT_27
+    h *= MIX_2
+    h ^= h >> SHIFT_31
+    return (h >> SHIFT_11) * (1.0 / (1 << 53))
+
+
+def octave_seed(seed, octave):
+    # Seed of one octave's lattice: splitmix64 of both, so nearby world seeds share no octaves.
+    h = (seed * 0x9E3779B97F4A7C15 + (octave + 1) * 0xC2B2AE3D27D4EB4F) & MASK64
+    h = ((h ^ (h >> 30)) * 0xBF58476D1CE4E5B9) & MASK64
+    h = ((h ^ (h >> 27)) * 0x94D049BB133111EB) & MASK64
+    return h ^ (h >> 31)
+
+
+def interpolate(seed, xs, ys):
+    # Value noise at points xs, ys (float arrays in lattice units, broadcast against each other).
+    ix = np.floor(xs).astype(np.int64)
+    iy = np.floor(ys).astype(np.int64)
+    fx = xs - ix
+    fy = ys - iy
+    sx = fx * fx * (3 - 2 * fx)
+    sy = fy * fy * (3 - 2 * fy)
+    top = lattice_values(seed, ix, iy) * (1 - sx) + lattice_values(seed, ix + 1, iy) * sx
+    bottom = lattice_values(seed, ix, iy + 1) * (1 - sx) + lattice_values(seed, ix + 1, iy + 1) * sx
+    return top * (1 - sy) + bottom * sy
+
+
+def value_noise(seed, x0, y0, width, height, period):
+    """Smoothly interpolated lattice noise over a rectangle of integer points.
+
+    Args:
+        seed (int): Noise seed.
+        x0 (int): Left edge of the rectangle, in world units.
+        y0 (int): Top edge of the rectangle.
+        width (int): Points per row.
+        height (int): Rows.
+        period (float): Lattice spacing in world units; features are about this wide.
+
+    Returns:
+        numpy.ndarray: height x width floats in [0, 1), indexed [y, x].
+    """
+    xs = (x0 + np.arange(width)) / period
+    ys = (y0 + np.arange(height)) / period
+    ix = np.floor(xs).astype(np.int64)
+    iy = np.floor(ys).astype(np.int64)
+    # Smoothstep weights hide the lattice grid
+    fx = xs - ix
+    fy = ys - iy
+    sx = fx * fx * (3 - 2 * fx)
+    sy = fy * fy * (3 - 2 * fy)
+    # Only the lattice points the rectangle touches are hashed
+    lx = np.arange(ix[0], ix[-1] + 2, dtype=np.int64)
+    ly = np.arange(iy[0], iy[-1] + 2, dtype=np.int64)
+    values = lattice_values(seed, lx[np.newaxis, :], ly[:, np.newaxis])
+    columns = ix - ix[0]
+    rows = iy - iy[0]
+    across = values[:, columns] * (1 - sx) + values[:, columns + 1] * sx
+    return across[rows] * (1 - sy)[:, np.newaxis] + across[rows + 1] * sy[:, np.newaxis]
+
+
+def fractal_noise(seed, x0, y0, width, height, period, octaves=OCTAVES):
+    """Sum octaves of value_noise for coarse shapes with finer detail, normalized to [0, 1)."""
+    total = np.zeros((height, width))
+    weight = 1.0
+    weights = 0.0
+    for octave in range(octaves):
+        total += weight * value_noise(octave_seed(seed, octave), x0, y0, width, height, period)
+        weights += weight
+        weight *= PERSISTENCE
+        period /= 2
+    return total / weights
+
+
+def fractal_noise_at(seed, xs, ys, period, octaves=OCTAVES):
+    # fractal_noise at scattered integer points instead of a rectangle; same values.
+    total = np.zeros(np.broadcast(xs, ys).shape)
+    weight = 1.0
+    weights = 0.0
+    for octave in range(octaves):
+        total += weight * interpolate(octave_seed(seed, octave), xs / period, ys / period)
+        weights += weight
+        weight *= PERSISTENCE
+        period /= 2
+    return total / weights
+
+
+# fractal_noise is bunched around 0.5, by an amount that depends on the period.
+# Its quantiles map values to ranks, so a threshold of 1 - f selects a fraction
+# f of the area.
+QUANTILES = np.linspace(0, 1, 257)
+
+
+@lru_cache(maxsize=None)
+def calibration(period):
+    """Quantiles of fractal_noise at one period, estimated once per process.
+
+    Sampled at random points far apart, so nearly every sample falls in a
+    lattice cell of its own; a dense rectangle the same size would see
+    only a few thousand cells and miss the targets by a percent or more.
+    """
+    rng = np.random.default_rng(0)
+    xs, ys = rng.integers(-1 << 40, 1 << 40, size=(2, CALIBRATION_SAMPLES))
+    return np.quantile(fractal_noise_at(0, xs.astype(np.float64), ys.astype(np.float64), period), QUANTILES)
+
+
+def uniform(values, period):
+    """Map fractal_noise values of the given period to their approximate rank in [0, 1]."""
+    return np.interp(values, calibration(period), QUANTILES)
@@ -0,0 +1,53 @@
+# Tests for world persistence and chunk memory bounds.
+# Run with python -m pytest from the repository root.
+
+import os
+import subprocess
+import sys
+from constants import Tile, WARM_CACHE_BYTES, WARM_ENTRY_BYTES
+from world import World, WATER_CHUNK
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# Changes 40 tiles, compacts the journal, waits for the saver thread to run the
+# compaction's writes and callbacks, then exits without closing anything
+COMPACT_AND_EXIT = """
+import os, sys
+from constants import Tile
+from world import World
+world = World(7, sys.argv[1])
+world.clear_chunk_files()
+for i in range(40):
+    world.set_tile(100 + i * 7, 60 + i * 5, Tile.WALL)
+world.flush_journal()
+world.compact_journal()
+world.saver.queue.join()
+os._exit(0)
+"""
+
+
+def test_compacted_changes_survive_hard_exit(tmp_path):
+    subprocess.run([sys.executable, "-c", COMPACT_AND_EXIT, str(tmp_path)], cwd=HERE, check=True)
+    world = World(7, str(tmp_path))
+    try:
+        world.recover_journal()
+        lost = [i for i in range(40) if world.get_tile(100 + i * 7, 60 + i * 5) != Tile.WALL]
+        assert not lost
+    finally:
+        world.close()
+
+
+def test_warm_cache_stays_bounded_over_open_water(tmp_path):
+    world = World(7, str(tmp_path))
+    try:
+        # Every chunk has listener state, like open water full of fish
+        world.add_chunk_listener(lambda cx, cy: True, lambda cx, cy: None)
+        for cx in range(4 * WARM_CACHE_BYTES // WARM_ENTRY_BYTES):
+            # What manage_chunks does as the player sails east through open water
+            world.install_chunk(cx, 5000, WATER_CHUNK)
+            world.evict_chunk(cx, 5000)
+        assert world.warm_bytes <= WARM_CACHE_BYTES
+        assert len(world.warm) <= WARM_CACHE_BYTES // WARM_ENTRY_BYTES
+        assert world.awaiting_reload <= world.warm.keys()
+    finally:
+        world.close()
@@ -2,198 +2,467 @@
 # Handles chunk loading, saving, generation, and starting area initialization.
 # Provides tile access and chunk management for the game world.
 
-import pickle
+import hashlib
+import math
 import random
 import os
+import pickle
+from collections import deque, OrderedDict
+from contextlib import contextmanager
+from functools import lru_cache
 from abc import ABC, abstractmethod
+import numpy as np
 from constants import *
-from cachetools import LRUCache
+from region import RegionStore, ChunkSaver
+from chunk_codec import encode_chunk, decode_chunk
+from journal import TileJournal
+from chunk_pool import ChunkPool
+from components import ComponentTable
+from terrain_noise import fractal_noise, uniform
+
+# Tile members indexed by their byte value, so raw chunk bytes map back to Tile
+TILES = tuple(Tile)
+
+def new_chunk(tile=Tile.WATER):
+    """Return a chunk filled with a single tile type.
+
+    Chunks are flat bytearrays of CHUNK_AREA tile values in row-major order,
+    so a tile costs one byte and whole rows are plain slice copies.
+    """
+    return bytearray([tile]) * CHUNK_AREA
+
+def chunk_rng(seed, cx, cy):
+    # Per-chunk NumPy RNG; SeedSequence mixes the three words, so this is stable across runs and platforms.
+    return np.random.default_rng([seed & 0xFFFFFFFF, cx & 0xFFFFFFFF, cy & 0xFFFFFFFF])
+
+def build_tile_index(chunk):
+    """Index a chunk's tiles by type.
+
+    Water is left out: it is most of every chunk and its count follows
+    from the rest.
+
+    Returns:
+        dict: {tile value: set of tile indices} for every non-water tile type present.
+    """
+    index = {}
+    tiles = np.frombuffer(chunk, dtype=np.uint8)
+    for i in np.flatnonzero(tiles != Tile.WATER).tolist():
+        index.setdefault(chunk[i], set()).add(i)
+    return index
+
+# Tile value -> counts as land for the coastline; the extra last entry stands
+# for tiles of chunks that are not loaded, which are neither land nor water
+LAND_LOOKUP = np.zeros(257, dtype=bool)
+LAND_LOOKUP[list(LAND_TILES)] = True
+OFF_MAP = 256
+LAND_TILE_SET = frozenset(LAND_TILES)
+# Per side, the offset of the chunk across it, and the slices of a flat chunk
+# giving its own edge row or column on that side and the other chunk's facing one
+EDGES = (
+    ((0, -1), slice(0, CHUNK_SIZE), slice(CHUNK_AREA - CHUNK_SIZE, CHUNK_AREA)),
+    ((0, 1), slice(CHUNK_AREA - CHUNK_SIZE, CHUNK_AREA), slice(0, CHUNK_SIZE)),
+    ((-1, 0), slice(0, CHUNK_AREA, CHUNK_SIZE), slice(CHUNK_SIZE - 1, CHUNK_AREA, CHUNK_SIZE)),
+    ((1, 0), slice(CHUNK_SIZE - 1, CHUNK_AREA, CHUNK_SIZE), slice(0, CHUNK_AREA, CHUNK_SIZE)),
+)
+
+def has_land(tiles):
+    return not LAND_TILE_SET.isdisjoint(bytes(tiles))
+
+def build_coastline(chunk, up=None, down=None, left=None, right=None):
+    """Find a chunk's coastline.
+
+    Shore tiles are LAND_TILES with a water 4-neighbour; coast water is
+    water with a LAND_TILES 4-neighbour. Neighbours across the chunk edge
+    are read from the adjacent chunks given; a missing chunk counts as
+    neither land nor water.
+
+    Returns:
+        tuple: (set of shore tile indices, set of coast water tile indices).
+    """
+    if not has_land(chunk) and not any(other is not None and has_land(other[facing])
+                                       for other, (offset, edge, facing) in zip((up, down, left, right), EDGES)):
+        return set(), set()  # Open water all round: no coastline, and no arrays to build
+    padded = np.full((CHUNK_SIZE + 2, CHUNK_SIZE + 2), OFF_MAP, dtype=np.int16)
+    padded[1:-1, 1:-1] = np.frombuffer(chunk, dtype=np.uint8).reshape(CHUNK_SIZE, CHUNK_SIZE)
+    if up is not None:
+        padded[0, 1:-1] = np.frombuffer(up, dtype=np.uint8)[-CHUNK_SIZE:]
+    if down is not None:
+        padded[-1, 1:-1] = np.frombuffer(down, dtype=np.uint8)[:CHUNK_SIZE]
+    if left is not None:
+        padded[1:-1, 0] = np.frombuffer(left, dtype=np.uint8)[CHUNK_SIZE - 1::CHUNK_SIZE]
+    if right is not None:
+        padded[1:-1, -1] = np.frombuffer(right, dtype=np.uint8)[::CHUNK_SIZE]
+    land = LAND_LOOKUP[padded]
+    water = padded == Tile.WATER
+
+    def beside(mask):
+        # Tiles of the chunk with mask set on any 4-neighbour
+        return mask[:-2, 1:-1] | mask[2:, 1:-1] | mask[1:-1, :-2] | mask[1:-1, 2:]
+
+    shore = land[1:-1, 1:-1] & beside(water)
+    coast = water[1:-1, 1:-1] & beside(land)
+    return set(np.flatnonzero(shore).tolist()), set(np.flatnonzero(coast).tolist())
+
+# Shared, immutable stand-in for every all-water chunk. Open ocean costs one
+# dict entry per chunk; set_tile copies it into a real chunk on first change.
+WATER_CHUNK = bytes(new_chunk())
+
+def warm_cost(chunk):
+    # Bytes a warm cache entry counts for: its tiles, which WATER_CHUNK shares, plus the
+    # entry itself (key, dict slots, components), so all-water chunks are not free.
+    return WARM_ENTRY_BYTES + (0 if chunk is WATER_CHUNK else len(chunk))
 
 class ChunkGenerator(ABC):
     """Base class for chunk generation strategies."""
+    land_fraction = LAND_FRACTION  # Share of land inside this generator's biome; see chunk_sea_level()
+
     @abstractmethod
-    def generate(self, cx, cy):
+    def generate(self, cx, cy, rng, elevation, sea_level):
         """Generate a chunk at coordinates (cx, cy).
 
+        Generation must be pure: all randomness comes from rng and the
+        terrain fields, so the same (seed, cx, cy) always yields the same chunk.
+
         Args:
             cx (int): Chunk x-coordinate.
             cy (int): Chunk y-coordinate.
+            rng (numpy.random.Generator): Chunk RNG from chunk_rng(seed, cx, cy).
+            elevation (numpy.ndarray): CHUNK_SIZE x CHUNK_SIZE world elevation of the
+                chunk's tiles, indexed [ty, tx] and uniform in [0, 1).
+            sea_level (numpy.ndarray): Elevation at which each tile turns to land, indexed
+                like elevation. Every generator sees the same seamless fields, so shapes
+                cut from them continue into neighbouring chunks whichever generator those use.
 
         Returns:
-            list: 2D list of tile types for the chunk.
+            bytearray: CHUNK_AREA tile values, row-major (index ty * CHUNK_SIZE + tx).
         """
         pass
 
-class DefaultIslandGenerator(ChunkGenerator):
+class IslandGenerator(ChunkGenerator):
+    """Raises the world elevation above sea level into islands, then scatters features.
+
+    Coastlines follow the elevation noise, so islands straddle chunk
+    borders. Every land tile then independently becomes one of the
+    features, with the probabilities in features.
+    """
+    features = ((Tile.TREE, TREE_CHANCE), (Tile.LOOT, LOOT_CHANCE), (Tile.BOULDER, BOULDER_CHANCE))
+
+    def generate(self, cx, cy, rng, elevation, sea_level):
+        tiles = np.full(CHUNK_AREA, Tile.WATER, dtype=np.uint8)
+        land = np.flatnonzero(elevation.ravel() >= sea_level.ravel())
+        tiles[land] = Tile.LAND
+        # One draw for all land tiles; each falls into at most one feature's probability band
+        rolls = rng.random(len(land))
+        upper = 0.0
+        for feature, chance in self.features:
+            lower, upper = upper, upper + chance
+            tiles[land[(rolls >= lower) & (rolls < upper)]] = feature
+        return bytearray(tiles)
+
+class DefaultIslandGenerator(IslandGenerator):
     """Generates chunks with sparse land masses, trees, loot, and boulders."""
-    def generate(self, cx, cy):
-        chunk = [[Tile.WATER for _ in range(CHUNK_SIZE)] for _ in range(CHUNK_SIZE)]
-        total_tiles = CHUNK_SIZE * CHUNK_SIZE
-        target_land_tiles = int(total_tiles * LAND_FRACTION)
-        land_tiles = []
-        land_tiles_placed = 0
-
-        while land_tiles_placed < target_land_tiles:
-            available_positions = [(tx, ty) for ty in range(CHUNK_SIZE) for tx in range(CHUNK_SIZE) if chunk[ty][tx] == Tile.WATER]
-            if not available_positions:
-                break
-            start_x, start_y = random.choice(available_positions)
-            mass_size = min(random.randint(MIN_LAND_MASS_SIZE, MAX_LAND_MASS_SIZE), target_land_tiles - land_tiles_placed)
-            if mass_size <= 0:
-                break
 
-            x, y = start_x, start_y
-            for _ in range(mass_size):
-                if 0 <= x < CHUNK_SIZE and 0 <= y < CHUNK_SIZE and chunk[y][x] == Tile.WATER:
-                    chunk[y][x] = Tile.LAND
-                    land_tiles.append((x, y))
-                    land_tiles_placed += 1
-                directions = [(0, 1), (0, -1), (1, 0), (-1, 0)]
-                random.shuffle(directions)
-                for dx, dy in directions:
-                    nx, ny = x + dx, y + dy
-                    if 0 <= nx < CHUNK_SIZE and 0 <= ny < CHUNK_SIZE and chunk[ny][nx] == Tile.WATER:
-                        x, y = nx, ny
-                        break
-                else:
-                    break
+class RockyIslandGenerator(IslandGenerator):
+    """Generates chunks with rocky islands and minimal vegetation."""
+    # Slightly less overall land to create more water between islands
+    land_fraction = 0.08
+    features = ((Tile.TREE, 0.1), (Tile.BOULDER, 0.2))
 
-        random.shuffle(land_tiles)
-        for i, (tx, ty) in enumerate(land_tiles):
-            r = random.random()
-            if r < TREE_CHANCE:
-                chunk[ty][tx] = Tile.TREE
-            elif r < TREE_CHANCE + LOOT_CHANCE:
-                chunk[ty][tx] = Tile.LOOT
-            elif r < TREE_CHANCE + LOOT_CHANCE + BOULDER_CHANCE:
-                chunk[ty][tx] = Tile.BOULDER
+class ForestedIslandGenerator(IslandGenerator):
+    """Generates chunks with dense, tree-covered islands."""
+    # Less overall land for more water between islands
+    land_fraction = 0.07  # 7% land
+    features = ((Tile.TREE, 0.5), (Tile.LOOT, 0.05))  # 50% trees, 5% loot
 
-        return chunk
+STARTING_GENERATOR = DefaultIslandGenerator()  # Chunks -2..2 around the origin
+DEFAULT_GENERATOR = DefaultIslandGenerator()
+ROCKY_GENERATOR = RockyIslandGenerator()
+FORESTED_GENERATOR = ForestedIslandGenerator()
 
-class RockyIslandGenerator(ChunkGenerator):
-    """Generates chunks with dense, rocky islands and minimal vegetation."""
-    def generate(self, cx, cy):
-        chunk = [[Tile.WATER for _ in range(CHUNK_SIZE)] for _ in range(CHUNK_SIZE)]
-        total_tiles = CHUNK_SIZE * CHUNK_SIZE
-        # Slightly less overall land to create more water between large islands
-        target_land_tiles = int(total_tiles * 0.08)
-        land_tiles = []
-        land_tiles_placed = 0
-
-        while land_tiles_placed < target_land_tiles:
-            available_positions = [(tx, ty) for ty in range(CHUNK_SIZE) for tx in range(CHUNK_SIZE) if chunk[ty][tx] == Tile.WATER]
-            if not available_positions:
-                break
-            start_x, start_y = random.choice(available_positions)
-            # Generate much larger island masses
-            mass_size = min(random.randint(20, 50), target_land_tiles - land_tiles_placed)
-            if mass_size <= 0:
-                break
+# --- Biomes ---
+# Generator plugins, chosen per chunk by a low-frequency biome noise field.
+BIOMES = []  # Registered (name, generator, weight), in registration order
+BIOME_BLOCK = 8  # Chunks per side of the blocks select_biome() computes and caches biomes for
+TERRAIN_BLOCK = 4  # Chunks per side of the blocks single_chunk_terrain() computes and caches
 
-            x, y = start_x, start_y
-            for _ in range(mass_size):
-                if 0 <= x < CHUNK_SIZE and 0 <= y < CHUNK_SIZE and chunk[y][x] == Tile.WATER:
-                    chunk[y][x] = Tile.LAND
-                    land_tiles.append((x, y))
-                    land_tiles_placed += 1
-                directions = [(0, 1), (0, -1), (1, 0), (-1, 0)]
-                random.shuffle(directions)
-                for dx, dy in directions:
-                    nx, ny = x + dx, y + dy
-                    if 0 <= nx < CHUNK_SIZE and 0 <= ny < CHUNK_SIZE and chunk[ny][nx] == Tile.WATER:
-                        x, y = nx, ny
-                        break
-                else:
-                    break
+def register_biome(name, generator, weight=1.0):
+    """Add a generator plugin to the biome table.
 
-        random.shuffle(land_tiles)
-        for i, (tx, ty) in enumerate(land_tiles):
-            r = random.random()
-            if r < 0.1:
-                chunk[ty][tx] = Tile.TREE
-            elif r < 0.3:
-                chunk[ty][tx] = Tile.BOULDER
+    The registered weights split the biome noise range into consecutive
+    bands, so a biome with twice the weight covers about twice the area,
+    in patches several chunks across.
 
-        return chunk
-    
-class ForestedIslandGenerator(ChunkGenerator):
-    """Generates chunks with dense, tree-covered islands."""
-    def generate(self, cx, cy):
-        chunk = [[Tile.WATER for _ in range(CHUNK_SIZE)] for _ in range(CHUNK_SIZE)]
-        total_tiles = CHUNK_SIZE * CHUNK_SIZE
-        # Less overall land for more water between bigger islands
-        target_land_tiles = int(total_tiles * 0.07)  # 7% land
-        land_tiles = []
-        land_tiles_placed = 0
-
-        while land_tiles_placed < target_land_tiles:
-            available_positions = [(tx, ty) for ty in range(CHUNK_SIZE) for tx in range(CHUNK_SIZE) if chunk[ty][tx] == Tile.WATER]
-            if not available_positions:
-                break
-            start_x, start_y = random.choice(available_positions)
-            # Double the size of islands for dense forests
-            mass_size = min(random.randint(24, 60), target_land_tiles - land_tiles_placed)
-            if mass_size <= 0:
-                break
+    Args:
+        name (str): Biome name, used in statistics and tools.
+        generator (ChunkGenerator): Generates the chunks of this biome.
+        weight (float): Share of the world relative to the other biomes.
+    """
+    BIOMES.append((name, generator, weight))
+    biome_block.cache_clear()
+    land_fraction_curve.cache_clear()
+    terrain_block.cache_clear()
+    generator_fingerprint.cache_clear()
 
-            x, y = start_x, start_y
-            for _ in range(mass_size):
-                if 0 <= x < CHUNK_SIZE and 0 <= y < CHUNK_SIZE and chunk[y][x] == Tile.WATER:
-                    chunk[y][x] = Tile.LAND
-                    land_tiles.append((x, y))
-                    land_tiles_placed += 1
-                directions = [(0, 1), (0, -1), (1, 0), (-1, 0)]
-                random.shuffle(directions)
-                for dx, dy in directions:
-                    nx, ny = x + dx, y + dy
-                    if 0 <= nx < CHUNK_SIZE and 0 <= ny < CHUNK_SIZE and chunk[ny][nx] == Tile.WATER:
-                        x, y = nx, ny
-                        break
-                else:
+def biome_noise(seed, x0, y0, width, height, scale=1):
+    """Rank in [0, 1] of the biome noise over a rectangle of points.
+
+    Points are scale per chunk: 1 gives one per chunk, the value that
+    picks its biome, and CHUNK_SIZE one per tile, which matches the chunk
+    values at each chunk's top-left tile.
+
+    Returns:
+        numpy.ndarray: height x width ranks, indexed [y, x].
+    """
+    # A separate noise stream: octave_seed() hashes the offset seed into lattices unrelated to the elevation's
+    return uniform(fractal_noise(seed + (1 << 32), x0, y0, width, height, BIOME_NOISE_PERIOD * scale), BIOME_NOISE_PERIOD)
+
+@lru_cache(maxsize=1)
+def land_fraction_curve():
+    # (biome noise ranks, land fractions) for np.interp: each biome's land_fraction holds across
+    # its band of ranks and ramps to the next biome's over BIOME_BLEND either side of the border.
+    total = sum(weight for _, _, weight in BIOMES)
+    ranks, fractions = [], []
+    upper = 0.0
+    for _, generator, weight in BIOMES:
+        lower, upper = upper, upper + weight / total
+        blend = min(BIOME_BLEND, (upper - lower) / 2)
+        ranks += [lower + blend, upper - blend]
+        fractions += [generator.land_fraction] * 2
+    return ranks, fractions
+
+def chunk_elevation(seed, cx0, cy0, width=1, height=1):
+    # Elevation of a width x height block of chunks as one array, indexed [y, x] in tiles.
+    return uniform(fractal_noise(seed, cx0 * CHUNK_SIZE, cy0 * CHUNK_SIZE,
+                                 width * CHUNK_SIZE, height * CHUNK_SIZE, ISLAND_NOISE_PERIOD), ISLAND_NOISE_PERIOD)
+
+def chunk_sea_level(seed, cx0, cy0, width=1, height=1):
+    """Sea level of a width x height block of chunks, indexed [y, x] in tiles.
+
+    The land fraction of the biomes is blended across the biome noise at
+    tile resolution, so where biomes meet the coastline moves gradually
+    instead of jumping at the chunk border. Inside a biome it is
+    1 - land_fraction of the biome's generator.
+    """
+    ranks = biome_noise(seed, cx0 * CHUNK_SIZE, cy0 * CHUNK_SIZE, width * CHUNK_SIZE, height * CHUNK_SIZE, CHUNK_SIZE)
+    return 1 - np.interp(ranks, *land_fraction_curve())
+
+@lru_cache(maxsize=32)
+def terrain_block(seed, bx, by):
+    # (elevation, sea level) of one TERRAIN_BLOCK x TERRAIN_BLOCK block of chunks, read-only.
+    cx0, cy0 = bx * TERRAIN_BLOCK, by * TERRAIN_BLOCK
+    fields = (chunk_elevation(seed, cx0, cy0, TERRAIN_BLOCK, TERRAIN_BLOCK),
+              chunk_sea_level(seed, cx0, cy0, TERRAIN_BLOCK, TERRAIN_BLOCK))
+    for field in fields:
+        field.flags.writeable = False
+    return fields
+
+def single_chunk_terrain(seed, cx, cy):
+    """Elevation and sea level of one chunk, cut from a cached block.
+
+    Neighbouring chunks are usually generated close together, so one noise
+    evaluation serves the whole block; the result is identical to
+    chunk_elevation(seed, cx, cy) and chunk_sea_level(seed, cx, cy).
+    """
+    x = (cx % TERRAIN_BLOCK) * CHUNK_SIZE
+    y = (cy % TERRAIN_BLOCK) * CHUNK_SIZE
+    return tuple(field[y:y + CHUNK_SIZE, x:x + CHUNK_SIZE]
+                 for field in terrain_block(seed, cx // TERRAIN_BLOCK, cy // TERRAIN_BLOCK))
+
+def chunk_biomes(seed, cx0, cy0, width=1, height=1):
+    """Pick the biome of each chunk in a block.
+
+    Returns:
+        list: Rows of (name, generator) pairs, indexed [cy - cy0][cx - cx0].
+    """
+    ranks = biome_noise(seed, cx0, cy0, width, height).tolist()
+    total = sum(weight for _, _, weight in BIOMES)
+    rows = []
+    for cy, row in enumerate(ranks, cy0):
+        picked = []
+        for cx, rank in enumerate(row, cx0):
+            if -2 <= cx <= 2 and -2 <= cy <= 2:
+                picked.append(("starting", STARTING_GENERATOR))
+                continue
+            upper = 0.0
+            for name, generator, weight in BIOMES:
+                upper += weight / total
+                if rank < upper:
                     break
+            picked.append((name, generator))
+        rows.append(picked)
+    return rows
 
-        random.shuffle(land_tiles)
-        for i, (tx, ty) in enumerate(land_tiles):
-            r = random.random()
-            if r < 0.5:  # 50% chance for trees
-                chunk[ty][tx] = Tile.TREE
-            elif r < 0.55:  # 5% chance for loot
-                chunk[ty][tx] = Tile.LOOT
+@lru_cache(maxsize=64)
+def biome_block(seed, bx, by):
+    # Biomes of one BIOME_BLOCK x BIOME_BLOCK block of chunks; the noise is seamless, so blocks match any other split.
+    return chunk_biomes(seed, bx * BIOME_BLOCK, by * BIOME_BLOCK, BIOME_BLOCK, BIOME_BLOCK)
 
-        return chunk
+def select_biome(seed, cx, cy):
+    # (name, generator) for one chunk; see chunk_biomes().
+    return biome_block(seed, cx // BIOME_BLOCK, cy // BIOME_BLOCK)[cy % BIOME_BLOCK][cx % BIOME_BLOCK]
+
+def generate_chunk_data(seed, cx, cy):
+    """Generate chunk (cx, cy) of the world with the given seed.
+
+    Module-level and pure, so ChunkPool worker processes can run it.
+
+    Returns:
+        bytes: CHUNK_AREA tile values, immutable so World can install them as is.
+    """
+    _, generator = select_biome(seed, cx, cy)
+    return bytes(generator.generate(cx, cy, chunk_rng(seed, cx, cy), *single_chunk_terrain(seed, cx, cy)))
+
+def generate_chunk_block(seed, cx0, cy0, width, height):
+    """Generate a width x height block of chunks with one pass over each noise field.
+
+    Gives the same chunks as generate_chunk_data() at a fraction of the
+    per-chunk cost, for pregeneration and benchmarks.
+
+    Returns:
+        dict: {(cx, cy): (biome name, chunk bytes)}.
+    """
+    elevation = chunk_elevation(seed, cx0, cy0, width, height)
+    sea_level = chunk_sea_level(seed, cx0, cy0, width, height)
+    biomes = chunk_biomes(seed, cx0, cy0, width, height)
+    chunks = {}
+    for y in range(height):
+        for x in range(width):
+            name, generator = biomes[y][x]
+            rows = slice(y * CHUNK_SIZE, (y + 1) * CHUNK_SIZE)
+            columns = slice(x * CHUNK_SIZE, (x + 1) * CHUNK_SIZE)
+            cx, cy = cx0 + x, cy0 + y
+            tiles = generator.generate(cx, cy, chunk_rng(seed, cx, cy), elevation[rows, columns], sea_level[rows, columns])
+            chunks[(cx, cy)] = (name, bytes(tiles))
+    return chunks
+
+# Blocks of chunks generated for generator_fingerprint(): (seed, cx0, cy0), away from the starting area
+FINGERPRINT_PROBES = ((1, 40, -24), (12345, -200, 96))
+
+@lru_cache(maxsize=1)
+def generator_fingerprint():
+    """Identify the chunk generator.
+
+    Saved chunks are mostly deltas against the generated chunk, so they
+    can only be decoded by the generator that saved them. This hashes the
+    biome registry and a sample of generated chunks, so changing the
+    noise, a threshold, a feature chance or the registered biomes changes
+    the fingerprint.
+
+    Returns:
+        str: Hex digest, stored in each save slot by World.save_seed().
+    """
+    digest = hashlib.sha256()
+    for name, generator, weight in BIOMES:
+        digest.update(f"{name}:{type(generator).__qualname__}:{weight!r};".encode())
+    for seed, cx0, cy0 in FINGERPRINT_PROBES:
+        for key, (name, tiles) in sorted(generate_chunk_block(seed, cx0, cy0, BIOME_BLOCK, BIOME_BLOCK).items()):
+            digest.update(name.encode())
+            digest.update(tiles)
+    return digest.hexdigest()
+
+register_biome("default", DEFAULT_GENERATOR)
+register_biome("rocky", ROCKY_GENERATOR)
+register_biome("forested", FORESTED_GENERATOR)
 
 class World:
-    def __init__(self):
+    def __init__(self, seed=None, directory=CHUNK_DIR):
         # Initialize the world with empty chunk storage and player state.
-        self.chunks = {}  # Dictionary: {(cx, cy): [[tile]]}
-        self.tile_cache = LRUCache(maxsize=10000)  # Cache up to 10,000 tiles
+        # Chunk content is a pure function of (seed, cx, cy); seed None uses
+        # WORLD_SEED, or a random seed if that is unset. directory holds the
+        # world's files: a save slot (see save_slots.py), or CHUNK_DIR itself.
+        if seed is None:
+            seed = WORLD_SEED if WORLD_SEED is not None else random.getrandbits(32)
+        self.seed = seed
+        self.directory = directory
+        self.chunks = {}  # Dictionary: {(cx, cy): CHUNK_AREA tiles; bytearray, or a read-only buffer (or WATER_CHUNK) until first write}
+        # Memo of the last chunk touched by get_tile/set_tile; consecutive lookups
+        # almost always land in the same chunk, so this skips the dict lookup.
+        self.memo_cx = None
+        self.memo_cy = None
+        self.memo_chunk = None
         self.player_chunk = (0, 0)  # Player’s current chunk
-        self.dirty_chunks = set()  # Track chunks needing saving
-        self.default_generator = DefaultIslandGenerator()
-        self.rocky_generator = RockyIslandGenerator()
-        self.forested_generator = ForestedIslandGenerator()
-        self.starting_generator = DefaultIslandGenerator()
+        self.prefetch_queue = deque()  # Chunk keys to warm ahead of the player, nearest first
+        self.prefetch_target = None  # Projected chunk the queue was last built for
+        self.dirty_chunks = set()  # Track chunks needing saving (loaded or warm)
+        self.tile_index = {}  # Loaded chunks' non-water tiles by type: {(cx, cy): {tile: set of tile indices}}
+        # Loaded chunks' coastline: {(cx, cy): (set of LAND_TILES indices next to water,
+        # set of water indices next to LAND_TILES)}; read it through chunk_coastline()
+        self.coastline = {}
+        self.coastline_stale = set()  # Loaded chunks to index before their coastline is next used
+        self.warm = OrderedDict()  # Recently evicted chunks, least recently evicted first: {(cx, cy): chunk}
+        self.warm_bytes = 0  # warm_cost() of the entries in self.warm, bounded by WARM_CACHE_BYTES
+        self.store = RegionStore(directory)
+        self.saver = ChunkSaver(self.store, self.encode_record)  # Encodes and persists chunk snapshots off the game thread
+        # Per-tile game state (see ComponentTable), pickled per chunk into r.*.components files
+        self.chunk_components = {}  # Loaded chunks' components: {(cx, cy): {name: {tile index: value}}}
+        self.component_dirty = set()  # Chunks whose components changed since they were last saved
+        self.warm_components = {}  # Components of the chunks in self.warm
+        self.component_store = RegionStore(directory, "components")
+        self.component_saver = ChunkSaver(self.component_store)
+        self.journal = TileJournal(directory)  # Every tile change, appended; compacted into the store
+        # Region stores forced to disk before a compacted journal segment is deleted; stores of
+        # other per-chunk data (like the world map) add themselves to be synced at the same time
+        self.synced_stores = [self.store, self.component_store]
+        # Game time in milliseconds, stamped on journal records and on timers stored with the
+        # chunks. It runs on across sessions: the game loop sets it to clock_offset plus the
+        # time since this session started, and it is saved in the slot with the chunks.
+        self.clock_offset = self.load_clock()
+        self.tick = self.clock_offset
+        self.pool = ChunkPool(generate_chunk_data, self.seed)  # Generates the ring around the view window in worker processes
         # Track how many special resource tiles have been placed
         self.tile_counts = {Tile.WOOD: 0, Tile.METAL: 0}
+        self.batch_depth = 0  # Nesting level of open batch() blocks
+        self.batch_chunks = set()  # Chunks written inside the current batch
+        self.subscribers = []  # Callbacks given each frame's list of (x, y, old, new) tile changes
+        self.tile_events = []  # Changes since the last publish_changes(), oldest first
+        self.chunk_listeners = []  # (on_unload, on_reload) callback pairs; see add_chunk_listener()
+        self.awaiting_reload = set()  # Warm chunks with listener state, reported to on_reload when loaded again
+
+    def save_seed(self):
+        # Saved chunk records are deltas against this seed's generation, so the seed and
+        # the generator's fingerprint are stored next to them; see save_slots.open_slot().
+        try:
+            with open(os.path.join(self.directory, SEED_FILE), "w") as f:
+                f.write(str(self.seed))
+            with open(os.path.join(self.directory, GENERATOR_FILE), "w") as f:
+                f.write(generator_fingerprint())
+        except OSError as e:
+            print(f"Error: Could not save world seed: {e}")
 
-    def _select_generator(self, cx, cy):
-        value = (cx + cy) % 3
-        if value == 0:
-            return self.rocky_generator            
-        elif value == 1:
-            return self.forested_generator         
-        return self.default_generator
+    def load_clock(self):
+        # Game time this world had reached when it was last saved, or 0 for a new world.
+        try:
+            with open(os.path.join(self.directory, CLOCK_FILE)) as f:
+                return int(f.read())
+        except (OSError, ValueError):
+            return 0
+
+    def save_clock(self):
+        # Written to a temporary file and renamed, so a crash never leaves a torn clock behind.
+        path = os.path.join(self.directory, CLOCK_FILE)
+        try:
+            with open(path + ".tmp", "w") as f:
+                f.write(str(self.tick))
+            os.replace(path + ".tmp", path)
+        except OSError as e:
+            print(f"Error: Could not save world clock: {e}")
 
     def clear_chunk_files(self):
-        # Clear all chunk files in CHUNK_DIR, creating the directory if it doesn't exist.
-        if not os.path.exists(CHUNK_DIR):
+        # Clear all region and journal files in the world's directory, creating it if it doesn't exist.
+        # Costs one unlink per file; starting a new save slot instead is instant.
+        self.saver.flush()
+        self.store.close()
+        self.component_saver.flush()
+        self.component_store.close()
+        self.journal.close()
+        if not os.path.exists(self.directory):
             try:
-                os.makedirs(CHUNK_DIR)
+                os.makedirs(self.directory)
             except OSError as e:
                 print(f"Error: Could not create chunk directory: {e}")
                 return
-        for filename in os.listdir(CHUNK_DIR):
-            file_path = os.path.join(CHUNK_DIR, filename)
+        for filename in os.listdir(self.directory):
+            file_path = os.path.join(self.directory, filename)
             try:
                 if os.path.isfile(file_path):
                     os.remove(file_path)
@@ -201,6 +470,7 @@ class World:
                 print(f"Warning: Could not delete file {file_path} due to permission error: {e}")
             except OSError as e:
                 print(f"Warning: Could not delete file {file_path}: {e}")
+        self.save_seed()
 
     def world_to_chunk(self, x, y):
         return int(x) // CHUNK_SIZE, int(y) // CHUNK_SIZE
@@ -209,137 +479,739 @@ class World:
         return cx * CHUNK_SIZE + tx, cy * CHUNK_SIZE + ty
 
     def generate_chunk(self, cx, cy):
-        generator = self._select_generator(cx, cy)
-        return generator.generate(cx, cy)
+        # Pure: also called from the saver thread to rebuild baselines for delta records.
+        _, generator = select_biome(self.seed, cx, cy)
+        return generator.generate(cx, cy, chunk_rng(self.seed, cx, cy), *single_chunk_terrain(self.seed, cx, cy))
+
+    def encode_record(self, cx, cy, tiles):
+        # Runs on the saver thread: regenerate the baseline so only changed tiles need storing.
+        return encode_chunk(tiles, self.generate_chunk(cx, cy))
 
     def save_chunk(self, cx, cy, chunk_data):
-        filename = os.path.join(CHUNK_DIR, f"chunk_{cx}_{cy}.pkl")
-        try:
-            with open(filename, "wb") as f:
-                pickle.dump(chunk_data, f)
-        except (OSError, pickle.PicklingError) as e:
-            print(f"Error saving chunk ({cx}, {cy}): {e}")
+        # Queue an immutable snapshot; the saver thread encodes it and writes it to the region file.
+        snapshot = bytes(chunk_data)
+        if snapshot == WATER_CHUNK:
+            # Cleared back to open water: share the sentinel instead of keeping a private copy
+            snapshot = WATER_CHUNK
+            if self.chunks.get((cx, cy)) is chunk_data:
+                self.install_chunk(cx, cy, WATER_CHUNK)
+        self.saver.submit(cx, cy, snapshot)
+
+    def load_chunk(self, cx, cy, baseline=None):
+        """Load a persisted chunk.
 
-    def load_chunk(self, cx, cy):
-        filename = os.path.join(CHUNK_DIR, f"chunk_{cx}_{cy}.pkl")
+        Returns the snapshot still queued in the saver, the decoded bytes
+        of a stored record, or for FORMAT_DELTA records the regenerated
+        chunk with the stored changes applied. set_tile copies read-only
+        buffers into a bytearray on first write.
+
+        Args:
+            cx (int): Chunk x-coordinate.
+            cy (int): Chunk y-coordinate.
+            baseline (bytes): The chunk as generated, if already at hand.
+        """
+        data = self.saver.read(cx, cy)
+        if data is not None:
+            return data
         try:
-            if os.path.exists(filename):
-                with open(filename, "rb") as f:
-                    return pickle.load(f)
-        except (OSError, pickle.UnpicklingError) as e:
+            record = self.store.read(cx, cy)
+            if record is None:
+                return None
+            return decode_chunk(record, lambda: baseline if baseline is not None else self.generate_chunk(cx, cy))
+        except (OSError, ValueError) as e:
             print(f"Error loading chunk ({cx}, {cy}): {e}")
-        return None
+            return None
+
+    def component_table(self, name):
+        # Dict-like view of one per-tile component, stored with the chunks.
+        return ComponentTable(self, name)
+
+    def save_components(self, cx, cy, components):
+        # Pickle now: component values are mutable, so the saver gets an immutable snapshot.
+        self.component_saver.submit(cx, cy, pickle.dumps(components, pickle.HIGHEST_PROTOCOL))
+
+    def load_components(self, cx, cy):
+        data = self.component_saver.read(cx, cy)
+        try:
+            if data is None:
+                data = self.component_store.read(cx, cy)
+            return pickle.loads(data) if data else None
+        except (OSError, pickle.UnpicklingError, EOFError) as e:
+            print(f"Error loading components of chunk ({cx}, {cy}): {e}")
+            return None
+
+    def install_chunk(self, cx, cy, chunk):
+        # Put chunk data into the loaded set; every write to self.chunks goes through here.
+        self.chunks[(cx, cy)] = chunk
+        if (cx, cy) not in self.tile_index:
+            # Newly loaded or generated; copy-on-write and sentinel swaps keep the contents
+            self.tile_index[(cx, cy)] = build_tile_index(chunk)
+            self.coastline_stale.add((cx, cy))
+            self.coastline_changed(cx, cy, chunk)
+        if cx == self.memo_cx and cy == self.memo_cy:
+            self.memo_chunk = chunk
+
+    def unload_chunk(self, cx, cy):
+        # Drop a chunk from memory without saving it.
+        chunk = self.chunks.pop((cx, cy))
+        del self.tile_index[(cx, cy)]
+        self.coastline.pop((cx, cy), None)
+        self.coastline_stale.discard((cx, cy))
+        self.coastline_changed(cx, cy, chunk)
+        if cx == self.memo_cx and cy == self.memo_cy:
+            self.memo_cx = self.memo_cy = self.memo_chunk = None
+
+    def coastline_changed(self, cx, cy, chunk):
+        # Chunk (cx, cy) was just loaded or unloaded, so the edge tiles of its loaded
+        # neighbours gained or lost their neighbours across the chunk edge. Those
+        # neighbours are indexed again on next use, unless neither facing edge has land.
+        for (dx, dy), edge, facing in EDGES:
+            other = self.chunks.get((cx + dx, cy + dy))
+            if other is not None and (has_land(chunk[edge]) or has_land(other[facing])):
+                self.coastline_stale.add((cx + dx, cy + dy))
+
+    def chunk_coastline(self, cx, cy):
+        """Return a loaded chunk's coastline, indexing it first if it is stale.
+
+        Returns:
+            tuple: (set of shore tile indices, set of coast water tile indices),
+            or None if the chunk is not loaded.
+        """
+        if (cx, cy) in self.coastline_stale:
+            self.coastline_stale.discard((cx, cy))
+            chunks = self.chunks
+            self.coastline[(cx, cy)] = build_coastline(
+                chunks[(cx, cy)], chunks.get((cx, cy - 1)), chunks.get((cx, cy + 1)),
+                chunks.get((cx - 1, cy)), chunks.get((cx + 1, cy)))
+        return self.coastline.get((cx, cy))
+
+    def update_coastline(self, x, y):
+        # Reclassify one tile after it or a neighbour changed; no-op if its chunk is
+        # not loaded, or is stale and will be indexed from its current tiles anyway.
+        cx = x // CHUNK_SIZE
+        cy = y // CHUNK_SIZE
+        if (cx, cy) in self.coastline_stale or (cx, cy) not in self.coastline:
+            return
+        shore_land, shore_water = self.coastline[(cx, cy)]
+        index = (y - cy * CHUNK_SIZE) * CHUNK_SIZE + x - cx * CHUNK_SIZE
+        tile = self.chunks[(cx, cy)][index]
+        neighbors = [self.peek_tile(x, y + 1), self.peek_tile(x, y - 1),
+                     self.peek_tile(x + 1, y), self.peek_tile(x - 1, y)]
+        if tile in LAND_TILE_SET and Tile.WATER in neighbors:
+            shore_land.add(index)
+        else:
+            shore_land.discard(index)
+        if tile == Tile.WATER and not LAND_TILE_SET.isdisjoint(neighbors):
+            shore_water.add(index)
+        else:
+            shore_water.discard(index)
+
+    def evict_chunk(self, cx, cy):
+        """Move a loaded chunk into the warm cache of recently evicted chunks.
+
+        Dirty chunks stay dirty there and are saved by the next compaction, or
+        when they fall out of the cache; the oldest entries go first once the
+        entries' warm_cost() adds up to more than WARM_CACHE_BYTES. Chunk
+        listeners are told about the unload; see add_chunk_listener().
+        """
+        # Listeners with state in the chunk ask to hear about its reload
+        if any([on_unload(cx, cy) for on_unload, on_reload in self.chunk_listeners]):
+            self.awaiting_reload.add((cx, cy))
+        chunk = self.chunks[(cx, cy)]
+        self.unload_chunk(cx, cy)
+        self.warm[(cx, cy)] = chunk
+        self.warm_bytes += warm_cost(chunk)
+        components = self.chunk_components.pop((cx, cy), None)
+        if components is not None:
+            self.warm_components[(cx, cy)] = components
+        while self.warm_bytes > WARM_CACHE_BYTES:
+            key, old = self.warm.popitem(last=False)
+            self.warm_bytes -= warm_cost(old)
+            # Listener state is in the stored components, which trigger on_reload from now on
+            self.awaiting_reload.discard(key)
+            components = self.warm_components.pop(key, None)
+            if key in self.dirty_chunks:
+                self.save_chunk(key[0], key[1], old)
+                self.dirty_chunks.discard(key)
+            if key in self.component_dirty:
+                self.save_components(key[0], key[1], components or {})
+                self.component_dirty.discard(key)
+
+    def ensure_chunk(self, cx, cy):
+        # Return the chunk at (cx, cy), loading it from disk or generating it if needed.
+        chunk = self.chunks.get((cx, cy))
+        if chunk is not None:
+            return chunk
+        if (cx, cy) in self.warm:
+            # Recently evicted: reinstall without touching the disk
+            chunk = self.warm.pop((cx, cy))
+            self.warm_bytes -= warm_cost(chunk)
+            components = self.warm_components.pop((cx, cy), None)
+            catch_up = (cx, cy) in self.awaiting_reload
+        else:
+            components = self.load_components(cx, cy)
+            # Listener state is stored in the components; awaiting_reload only covers warm chunks
+            catch_up = bool(components)
+            # Taken from the worker pool when the ring got there first
+            generated = self.pool.take((cx, cy))
+            loaded_data = self.load_chunk(cx, cy, generated)
+            if loaded_data is not None:
+                chunk = loaded_data
+            elif generated is not None:
+                chunk = generated
+            else:
+                chunk = self.generate_chunk(cx, cy)
+            if chunk == WATER_CHUNK:
+                # Uniform water: never written, so never dirty and never saved
+                chunk = WATER_CHUNK
+        self.install_chunk(cx, cy, chunk)
+        if components:
+            self.chunk_components[(cx, cy)] = components
+        if catch_up:
+            self.awaiting_reload.discard((cx, cy))
+            # Let listeners apply the time the chunk spent unloaded
+            for on_unload, on_reload in self.chunk_listeners:
+                on_reload(cx, cy)
+            chunk = self.chunks[(cx, cy)]  # Catch-up writes may have copied it
+        return chunk
 
     def get_tile(self, x, y):
-        key = (x, y)
-        if key in self.tile_cache:
-            return self.tile_cache[key]
-        cx, cy = self.world_to_chunk(x, y)
-        tx = int(x % CHUNK_SIZE)
-        ty = int(y % CHUNK_SIZE)
-        if tx < 0:
-            tx += CHUNK_SIZE
-        if ty < 0:
-            ty += CHUNK_SIZE
-        if (cx, cy) not in self.chunks:
-            loaded_data = self.load_chunk(cx, cy)
-            self.chunks[(cx, cy)] = loaded_data if loaded_data is not None else self.generate_chunk(cx, cy)
-        tile = self.chunks[(cx, cy)][ty][tx]
-        self.tile_cache[key] = tile
-        return tile
+        # x and y are integer world coordinates. Floor division keeps negative
+        # coordinates in the right chunk, so no sign fix-ups are needed.
+        cx = x // CHUNK_SIZE
+        cy = y // CHUNK_SIZE
+        if cx == self.memo_cx and cy == self.memo_cy:
+            chunk = self.memo_chunk
+        else:
+            chunk = self.ensure_chunk(cx, cy)
+            self.memo_cx, self.memo_cy, self.memo_chunk = cx, cy, chunk
+        return TILES[chunk[(y - cy * CHUNK_SIZE) * CHUNK_SIZE + x - cx * CHUNK_SIZE]]
+
+    def peek_tile(self, x, y):
+        # Like get_tile, but None instead of loading or generating an unloaded chunk.
+        chunk = self.chunks.get((x // CHUNK_SIZE, y // CHUNK_SIZE))
+        if chunk is None:
+            return None
+        return chunk[(y % CHUNK_SIZE) * CHUNK_SIZE + x % CHUNK_SIZE]
+
+    def get_region(self, x0, y0, width, height):
+        """Return a rectangle of tiles as one contiguous array.
+
+        Stitches the covering chunks together with slice copies, loading or
+        generating chunks like get_tile does.
+
+        Args:
+            x0 (int): World x-coordinate of the left column.
+            y0 (int): World y-coordinate of the top row.
+            width (int): Number of columns.
+            height (int): Number of rows.
+
+        Returns:
+            numpy.ndarray: uint8 tile values of shape (height, width), indexed [y, x].
+        """
+        region = np.empty((height, width), dtype=np.uint8)
+        x1, y1 = x0 + width, y0 + height
+        for cy in range(y0 // CHUNK_SIZE, (y1 - 1) // CHUNK_SIZE + 1):
+            top = max(y0, cy * CHUNK_SIZE)
+            bottom = min(y1, (cy + 1) * CHUNK_SIZE)
+            for cx in range(x0 // CHUNK_SIZE, (x1 - 1) // CHUNK_SIZE + 1):
+                left = max(x0, cx * CHUNK_SIZE)
+                right = min(x1, (cx + 1) * CHUNK_SIZE)
+                tiles = np.frombuffer(self.ensure_chunk(cx, cy), dtype=np.uint8).reshape(CHUNK_SIZE, CHUNK_SIZE)
+                region[top - y0:bottom - y0, left - x0:right - x0] = tiles[
+                    top - cy * CHUNK_SIZE:bottom - cy * CHUNK_SIZE,
+                    left - cx * CHUNK_SIZE:right - cx * CHUNK_SIZE]
+        return region
+
+    def tile_count(self, cx, cy, tile):
+        # Number of tiles of one type in a loaded chunk (0 if it is not loaded).
+        positions = self.tile_index.get((cx, cy))
+        if positions is None:
+            return 0
+        if tile == Tile.WATER:
+            return CHUNK_AREA - sum(map(len, positions.values()))
+        return len(positions.get(tile, ()))
+
+    def tile_positions(self, chunk_keys, tiles):
+        """List the world positions of tiles of the given types.
+
+        Costs O(chunks + result) using the per-chunk index; chunks among
+        chunk_keys that are not loaded are skipped.
+
+        Args:
+            chunk_keys (iterable): (cx, cy) chunks to search.
+            tiles (iterable): Non-water tile types to find.
+
+        Returns:
+            list: (x, y) world coordinates.
+        """
+        result = []
+        for cx, cy in chunk_keys:
+            positions = self.tile_index.get((cx, cy))
+            if not positions:
+                continue
+            for tile in tiles:
+                for i in positions.get(tile, ()):
+                    result.append((cx * CHUNK_SIZE + i % CHUNK_SIZE, cy * CHUNK_SIZE + i // CHUNK_SIZE))
+        return result
+
+    def find_tiles(self, x0, y0, width, height, tiles):
+        """List the world positions of tiles of the given types inside a rectangle.
+
+        Loads or generates the covering chunks like get_region does.
+
+        Args:
+            x0 (int): World x-coordinate of the left column.
+            y0 (int): World y-coordinate of the top row.
+            width (int): Number of columns.
+            height (int): Number of rows.
+            tiles (iterable): Non-water tile types to find.
+
+        Returns:
+            list: (x, y) world coordinates.
+        """
+        x1, y1 = x0 + width, y0 + height
+        keys = []
+        for cy in range(y0 // CHUNK_SIZE, (y1 - 1) // CHUNK_SIZE + 1):
+            for cx in range(x0 // CHUNK_SIZE, (x1 - 1) // CHUNK_SIZE + 1):
+                self.ensure_chunk(cx, cy)
+                keys.append((cx, cy))
+        return [(x, y) for x, y in self.tile_positions(keys, tiles) if x0 <= x < x1 and y0 <= y < y1]
+
+    def random_tile(self, chunk_keys, tiles):
+        """Pick a tile uniformly among the tiles of the given types.
+
+        Chunks are weighted by their indexed counts, so only the chosen
+        chunk is looked at; water, which is not indexed, is found by
+        sampling the chunk until a water tile comes up.
+
+        Args:
+            chunk_keys (iterable): (cx, cy) chunks to choose from; unloaded ones are skipped.
+            tiles (iterable): Tile types to choose among, water included.
+
+        Returns:
+            tuple: (x, y) world coordinates, or None if there is no such tile.
+        """
+        wanted = set(tiles)
+        choices = []
+        total = 0
+        for cx, cy in chunk_keys:
+            positions = self.tile_index.get((cx, cy))
+            if positions is None:
+                continue
+            for tile, cell in positions.items():
+                if tile in wanted:
+                    choices.append((cx, cy, tile, len(cell)))
+                    total += len(cell)
+            if Tile.WATER in wanted:
+                count = CHUNK_AREA - sum(map(len, positions.values()))
+                if count:
+                    choices.append((cx, cy, Tile.WATER, count))
+                    total += count
+        if not total:
+            return None
+        pick = random.randrange(total)
+        for cx, cy, tile, count in choices:
+            if pick < count:
+                break
+            pick -= count
+        if tile == Tile.WATER:
+            chunk = self.chunks[(cx, cy)]
+            i = random.randrange(CHUNK_AREA)
+            while chunk[i] != Tile.WATER:
+                i = random.randrange(CHUNK_AREA)
+        else:
+            i = random.choice(tuple(self.tile_index[(cx, cy)][tile]))
+        return cx * CHUNK_SIZE + i % CHUNK_SIZE, cy * CHUNK_SIZE + i // CHUNK_SIZE
+
+    def is_shore(self, x, y):
+        """Tell whether a tile is on the coastline.
+
+        True for LAND_TILES next to water and water next to LAND_TILES,
+        answered from the index in O(1). Neighbours in chunks that are not
+        loaded do not count, and tiles of unloaded chunks are never shore.
+        """
+        cx = x // CHUNK_SIZE
+        cy = y // CHUNK_SIZE
+        coastline = self.chunk_coastline(cx, cy)
+        if coastline is None:
+            return False
+        index = (y - cy * CHUNK_SIZE) * CHUNK_SIZE + x - cx * CHUNK_SIZE
+        return index in coastline[0] or index in coastline[1]
+
+    def shore_positions(self, chunk_keys, water=False):
+        """List the world positions of coastline tiles.
+
+        Args:
+            chunk_keys (iterable): (cx, cy) chunks to search; unloaded ones are skipped.
+            water (bool): List the water side of the coastline instead of the land side.
+
+        Returns:
+            list: (x, y) world coordinates.
+        """
+        result = []
+        for cx, cy in chunk_keys:
+            coastline = self.chunk_coastline(cx, cy)
+            if coastline is None:
+                continue
+            for i in coastline[water]:
+                result.append((cx * CHUNK_SIZE + i % CHUNK_SIZE, cy * CHUNK_SIZE + i // CHUNK_SIZE))
+        return result
+
+    def random_shore_tile(self, chunk_keys, water=False):
+        """Pick a coastline tile uniformly, like random_tile.
+
+        Args:
+            chunk_keys (iterable): (cx, cy) chunks to choose from; unloaded ones are skipped.
+            water (bool): Pick from the water side of the coastline instead of the land side.
+
+        Returns:
+            tuple: (x, y) world coordinates, or None if there is no such tile.
+        """
+        choices = []
+        total = 0
+        for cx, cy in chunk_keys:
+            coastline = self.chunk_coastline(cx, cy)
+            if coastline and coastline[water]:
+                choices.append((coastline[water], cx, cy))
+                total += len(coastline[water])
+        if not total:
+            return None
+        pick = random.randrange(total)
+        for cell, cx, cy in choices:
+            if pick < len(cell):
+                break
+            pick -= len(cell)
+        i = random.choice(tuple(cell))
+        return cx * CHUNK_SIZE + i % CHUNK_SIZE, cy * CHUNK_SIZE + i // CHUNK_SIZE
 
     def set_tile(self, x, y, tile_type):
-        cx, cy = self.world_to_chunk(x, y)
-        tx = int(x % CHUNK_SIZE)
-        ty = int(y % CHUNK_SIZE)
-        if tx < 0:
-            tx += CHUNK_SIZE
-        if ty < 0:
-            ty += CHUNK_SIZE
-        if (cx, cy) not in self.chunks:
-            loaded_data = self.load_chunk(cx, cy)
-            self.chunks[(cx, cy)] = loaded_data if loaded_data is not None else self.generate_chunk(cx, cy)
-        old_tile = self.chunks[(cx, cy)][ty][tx]
-        self.chunks[(cx, cy)][ty][tx] = tile_type
-        self.tile_cache[(x, y)] = tile_type
-        if tile_type in self.tile_counts and old_tile != tile_type:
+        cx = x // CHUNK_SIZE
+        cy = y // CHUNK_SIZE
+        if cx == self.memo_cx and cy == self.memo_cy:
+            chunk = self.memo_chunk
+        else:
+            chunk = self.ensure_chunk(cx, cy)
+            self.memo_cx, self.memo_cy, self.memo_chunk = cx, cy, chunk
+        index = (y - cy * CHUNK_SIZE) * CHUNK_SIZE + x - cx * CHUNK_SIZE
+        if chunk[index] == tile_type:
+            return  # No change: keep shared and read-only chunks unmaterialized
+        if type(chunk) is not bytearray:
+            # Copy-on-write: materialize a read-only chunk (loaded bytes or WATER_CHUNK) on first change
+            chunk = bytearray(chunk)
+            self.install_chunk(cx, cy, chunk)
+        old_tile = chunk[index]
+        self.journal.append(x, y, old_tile, tile_type, self.tick)
+        chunk[index] = tile_type
+        positions = self.tile_index[(cx, cy)]
+        if old_tile != Tile.WATER:
+            cell = positions[old_tile]
+            cell.discard(index)
+            if not cell:
+                del positions[old_tile]
+        if tile_type != Tile.WATER:
+            positions.setdefault(tile_type, set()).add(index)
+        if ((old_tile in LAND_TILE_SET) != (tile_type in LAND_TILE_SET) or
+                (old_tile == Tile.WATER) != (tile_type == Tile.WATER)):
+            # Land or water appeared or went: the tile and its neighbours may have joined or left the coastline
+            for nx, ny in ((x, y), (x, y + 1), (x, y - 1), (x + 1, y), (x - 1, y)):
+                self.update_coastline(nx, ny)
+        if self.subscribers:
+            self.tile_events.append((x, y, old_tile, tile_type))
+        if tile_type in self.tile_counts:
             self.tile_counts[tile_type] += 1
-        self.dirty_chunks.add((cx, cy))
+        if self.batch_depth:
+            self.batch_chunks.add((cx, cy))
+        else:
+            self.dirty_chunks.add((cx, cy))
+
+    @contextmanager
+    def batch(self):
+        """Group tile writes into a single change.
+
+        Inside the block set_tile only records which chunks it touched; on
+        exit each touched chunk is marked dirty once, however many tiles
+        were written. Blocks may be nested.
+        """
+        self.batch_depth += 1
+        try:
+            yield self
+        finally:
+            self.batch_depth -= 1
+            if not self.batch_depth and self.batch_chunks:
+                self.dirty_chunks.update(self.batch_chunks)
+                self.batch_chunks.clear()
+
+    def set_tiles(self, changes):
+        """Apply many tile writes as one batch.
+
+        Args:
+            changes (iterable): (x, y, tile_type) triples, consumed lazily.
+        """
+        with self.batch():
+            for x, y, tile_type in changes:
+                self.set_tile(x, y, tile_type)
+
+    def subscribe(self, callback):
+        """Register callback(events) for tile changes.
+
+        events is the list of (x, y, old, new) changes since the previous
+        delivery, in the order they happened; see publish_changes().
+        """
+        self.subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        self.subscribers.remove(callback)
+        if not self.subscribers:
+            self.tile_events.clear()
+
+    def add_chunk_listener(self, on_unload, on_reload):
+        """Register callbacks for chunks leaving and re-entering memory.
+
+        on_unload(cx, cy) runs when manage_chunks evicts a chunk and returns
+        True if the listener has state in it to catch up later. Once such a
+        chunk is loaded again, on_reload(cx, cy) runs right after it is
+        installed, so the listener can apply the elapsed time in one step
+        instead of simulating off-screen chunks every frame. Listeners keep
+        their own timestamps: with the chunk's components, state stamped
+        with World.tick survives the chunk being saved and reloaded.
+        Only warm chunks are remembered; on_reload also runs for every
+        chunk loaded from disk with stored components, so that state must
+        live in the components.
+        """
+        self.chunk_listeners.append((on_unload, on_reload))
+
+    def publish_changes(self):
+        # Deliver the queued tile changes to every subscriber in one batch; call once per frame.
+        if not self.tile_events:
+            return
+        events = self.tile_events
+        self.tile_events = []
+        for callback in self.subscribers:
+            callback(events)
 
     def save_dirty_chunks(self):
         for cx, cy in self.dirty_chunks:
-            if (cx, cy) in self.chunks:
-                self.save_chunk(cx, cy, self.chunks[(cx, cy)])
+            chunk = self.chunks.get((cx, cy))
+            if chunk is None:
+                chunk = self.warm.get((cx, cy))
+            if chunk is not None:
+                self.save_chunk(cx, cy, chunk)
         self.dirty_chunks.clear()
+        for cx, cy in self.component_dirty:
+            components = self.chunk_components.get((cx, cy))
+            if components is None:
+                components = self.warm_components.get((cx, cy), {})
+            self.save_components(cx, cy, components)
+        self.component_dirty.clear()
+
+    def flush_journal(self):
+        # Hand this frame's tile changes to the OS; call once per frame.
+        self.journal.flush()
+        if self.journal.size >= JOURNAL_COMPACT_BYTES:
+            self.compact_journal()
+
+    def compact_journal(self):
+        """Fold the journaled tile changes into the region store.
+
+        Closes the current journal segment, queues the dirty chunks for the
+        saver thread and deletes the closed segment on that thread once
+        they are written and synced to disk. Changes made meanwhile go to a
+        new segment.
+        """
+        segment = self.journal.rotate()
+        self.save_dirty_chunks()
+        self.save_clock()
+        if segment is not None:
+            self.saver.call(lambda: self.discard_segment(segment))
+
+    def discard_segment(self, segment):
+        # Runs on the saver thread once the chunk writes a segment covers are done: the segment
+        # is the only other copy of those changes, so they must be on disk before it goes.
+        self.component_saver.flush()
+        try:
+            for store in self.synced_stores:
+                store.sync()
+        except OSError as e:
+            print(f"Error syncing chunk store, keeping journal segment {segment}: {e}")
+            return
+        self.journal.discard(segment)
+
+    def recover_journal(self):
+        """Replay journal segments left behind by a session that did not close cleanly.
+
+        Call after opening an existing world and before any other change.
+        Changes already folded into the store replay as no-ops; the rest are
+        re-journaled and the old segments deleted.
+
+        Returns:
+            int: Number of journal records read.
+        """
+        segments = self.journal.segments()
+        count = 0
+        with self.batch():
+            for number in segments:
+                for x, y, old, new, tick in self.journal.read(number):
+                    self.set_tile(x, y, new)
+                    # The clock was saved at the last compaction; the journal knows how far it got since
+                    self.clock_offset = max(self.clock_offset, tick)
+                    count += 1
+        self.tick = self.clock_offset
+        self.journal.flush()
+        for number in segments:
+            self.journal.discard(self.journal.segment_path(number))
+        return count
+
+    def flush(self):
+        # Block until every queued chunk snapshot has been written to disk.
+        self.journal.flush()
+        self.save_dirty_chunks()
+        try:
+            self.saver.flush()
+            self.component_saver.flush()
+        except OSError as e:
+            print(f"Error flushing chunk store: {e}")
+
+    def close(self):
+        # Persist outstanding changes, stop the saver thread and release the region files.
+        self.pool.close()
+        self.compact_journal()
+        self.saver.close()
+        self.component_saver.close()
+        self.journal.close()
+        self.store.close()
+        self.component_store.close()
 
     def initialize_starting_area(self):
-        for cx in range(-2, 3):
-            for cy in range(-2, 3):
-                self.chunks[(cx, cy)] = self.starting_generator.generate(cx, cy)
-        
-        target_land_tiles = random.randint(STARTING_AREA_LAND_MIN, STARTING_AREA_LAND_MAX)
-        land_mass = set()
-        frontier = [(0, 0)]
-        land_mass.add((0, 0))
-        self.set_tile(0, 0, Tile.LAND)
-        
-        while len(land_mass) < target_land_tiles and frontier:
-            cx, cy = frontier.pop(0)
-            neighbors = [
-                (cx+1, cy), (cx-1, cy), (cx, cy+1), (cx, cy-1),
-                (cx+1, cy+1), (cx+1, cy-1), (cx-1, cy+1), (cx-1, cy-1)
-            ]
-            random.shuffle(neighbors)
-            for nx, ny in neighbors:
-                if len(land_mass) >= target_land_tiles:
-                    break
-                if (abs(nx) <= 2 and abs(ny) <= 2 and
-                        (nx, ny) not in land_mass and
-                        self.get_tile(nx, ny) == Tile.WATER):
-                    if random.random() < 0.8:
-                        self.set_tile(nx, ny, Tile.LAND)
-                        land_mass.add((nx, ny))
-                        frontier.append((nx, ny))
-        
-        land_tiles = list(land_mass)
-        features_to_add = random.randint(STARTING_AREA_FEATURES_MIN, STARTING_AREA_FEATURES_MAX)
-        random.shuffle(land_tiles)
-        for i in range(min(features_to_add, len(land_tiles))):
-            tx, ty = land_tiles[i]
-            feature = random.choices(
-                [Tile.TREE, Tile.LOOT, Tile.BOULDER],
-                weights=[0.6, 0.3, 0.1],
-                k=1
-            )[0]
-            self.set_tile(tx, ty, feature)
-
-        # Place the skull pedestal near the starting position
-        if self.get_tile(1, 0) == Tile.LAND:
-            self.set_tile(1, 0, Tile.SKULL_PEDESTAL)
-        else:
-            self.set_tile(0, 1, Tile.SKULL_PEDESTAL)
+        # All starting-area writes count as one change
+        # Seeded separately from the chunks, so the whole starting island follows from the seed.
+        # The island itself is stored as changes on top of the generated chunks.
+        rng = random.Random(f"{self.seed}:start")
+        with self.batch():
+            for cx in range(-2, 3):
+                for cy in range(-2, 3):
+                    self.install_chunk(cx, cy, self.generate_chunk(cx, cy))
+
+            target_land_tiles = rng.randint(STARTING_AREA_LAND_MIN, STARTING_AREA_LAND_MAX)
+            land_mass = set()
+            frontier = [(0, 0)]
+            land_mass.add((0, 0))
+            self.set_tile(0, 0, Tile.LAND)
+
+            while len(land_mass) < target_land_tiles and frontier:
+                cx, cy = frontier.pop(0)
+                neighbors = [
+                    (cx+1, cy), (cx-1, cy), (cx, cy+1), (cx, cy-1),
+                    (cx+1, cy+1), (cx+1, cy-1), (cx-1, cy+1), (cx-1, cy-1)
+                ]
+                rng.shuffle(neighbors)
+                for nx, ny in neighbors:
+                    if len(land_mass) >= target_land_tiles:
+                        break
+                    if (abs(nx) <= 2 and abs(ny) <= 2 and
+                            (nx, ny) not in land_mass and
+                            self.get_tile(nx, ny) == Tile.WATER):
+                        if rng.random() < 0.8:
+                            self.set_tile(nx, ny, Tile.LAND)
+                            land_mass.add((nx, ny))
+                            frontier.append((nx, ny))
+
+            land_tiles = list(land_mass)
+            features_to_add = rng.randint(STARTING_AREA_FEATURES_MIN, STARTING_AREA_FEATURES_MAX)
+            rng.shuffle(land_tiles)
+            for i in range(min(features_to_add, len(land_tiles))):
+                tx, ty = land_tiles[i]
+                feature = rng.choices(
+                    [Tile.TREE, Tile.LOOT, Tile.BOULDER],
+                    weights=[0.6, 0.3, 0.1],
+                    k=1
+                )[0]
+                self.set_tile(tx, ty, feature)
+
+            # Place the skull pedestal near the starting position
+            if self.get_tile(1, 0) == Tile.LAND:
+                self.set_tile(1, 0, Tile.SKULL_PEDESTAL)
+            else:
+                self.set_tile(0, 1, Tile.SKULL_PEDESTAL)
 
     def update_player_chunk(self, player_pos):
         self.player_chunk = self.world_to_chunk(player_pos[0], player_pos[1])
 
+    def prefetch(self, player_pos, velocity):
+        """Queue the chunks the player is heading towards.
+
+        Projects the position PREFETCH_LOOKAHEAD frames ahead along velocity
+        (tiles per frame) and queues the part of the view window around the
+        projected chunk that is not loaded yet. prefetch_step() then loads the
+        queue a few chunks per frame, so crossing a chunk boundary finds the
+        new edge of the window already in memory.
+
+        Args:
+            player_pos (list): Player position in world coordinates.
+            velocity (tuple): Movement this frame as (dx, dy) in tiles.
+        """
+        dx, dy = velocity
+        target = self.world_to_chunk(math.floor(player_pos[0] + dx * PREFETCH_LOOKAHEAD),
+                                     math.floor(player_pos[1] + dy * PREFETCH_LOOKAHEAD))
+        if target == self.prefetch_target:
+            return
+        self.prefetch_target = target
+        if target == self.player_chunk:
+            # Stopped, or turned back: the old lookahead is no longer where the player is heading
+            self.prefetch_queue.clear()
+            return
+        tcx, tcy = target
+        half = VIEW_CHUNKS // 2
+        keys = [(tcx + ox, tcy + oy) for ox in range(-half, half + 1) for oy in range(-half, half + 1)]
+        keys = [key for key in keys if key not in self.chunks]
+        # Nearest to the player first: those are the ones the next crossing needs
+        pcx, pcy = self.player_chunk
+        keys.sort(key=lambda key: max(abs(key[0] - pcx), abs(key[1] - pcy)))
+        self.prefetch_queue = deque(keys)
+
+    def prefetch_step(self, budget=PREFETCH_CHUNKS_PER_FRAME):
+        # Load or generate up to budget queued chunks; call once per frame.
+        while budget > 0 and self.prefetch_queue:
+            cx, cy = self.prefetch_queue.popleft()
+            if (cx, cy) not in self.chunks:
+                self.ensure_chunk(cx, cy)
+                budget -= 1
+
     def manage_chunks(self):
         cx, cy = self.player_chunk
         loaded_chunks = set()
         for dx in range(-VIEW_CHUNKS // 2, VIEW_CHUNKS // 2 + 1):
             for dy in range(-VIEW_CHUNKS // 2, VIEW_CHUNKS // 2 + 1):
-                chunk_key = (cx + dx, cy + dy)
-                loaded_chunks.add(chunk_key)
-                if chunk_key not in self.chunks:
-                    loaded_data = self.load_chunk(cx + dx, cy + dy)
-                    self.chunks[chunk_key] = loaded_data if loaded_data is not None else self.generate_chunk(cx + dx, cy + dy)
+                loaded_chunks.add((cx + dx, cy + dy))
+                self.ensure_chunk(cx + dx, cy + dy)
+        if self.prefetch_target is not None:
+            # Keep chunks already warmed for the window the player is heading into
+            tcx, tcy = self.prefetch_target
+            for dx in range(-VIEW_CHUNKS // 2, VIEW_CHUNKS // 2 + 1):
+                for dy in range(-VIEW_CHUNKS // 2, VIEW_CHUNKS // 2 + 1):
+                    loaded_chunks.add((tcx + dx, tcy + dy))
+        if GENERATION_RING:
+            # Generate the ring just outside the view window in worker processes, nearest first.
+            # Work is kept CHUNK_HYSTERESIS chunks further out, like loaded chunks, so
+            # walking back and forth across a chunk edge never cancels and resubmits a column.
+            reach = VIEW_CHUNKS // 2 + GENERATION_RING
+            band = reach + CHUNK_HYSTERESIS
+            wanted = set()
+            ring = []
+            for dx in range(-band, band + 1):
+                for dy in range(-band, band + 1):
+                    key = (cx + dx, cy + dy)
+                    if key in self.chunks or key in self.warm:
+                        continue  # Installed without generating
+                    wanted.add(key)
+                    if max(abs(dx), abs(dy)) <= reach:
+                        ring.append(key)
+            ring.sort(key=lambda key: max(abs(key[0] - cx), abs(key[1] - cy)))
+            self.pool.retain(wanted)
+            self.pool.request(ring)
+        # Hysteresis: only evict chunks CHUNK_HYSTERESIS chunks beyond the window, so
+        # walking back and forth across a chunk edge never evicts anything
+        keep = VIEW_CHUNKS // 2 + CHUNK_HYSTERESIS
         for key in list(self.chunks.keys()):
-            if key not in loaded_chunks:
-                if key in self.dirty_chunks:
-                    self.save_chunk(key[0], key[1], self.chunks[key])
-                self.dirty_chunks.discard(key)
-                cx, cy = key
-                for ty in range(CHUNK_SIZE):
-                    for tx in range(CHUNK_SIZE):
-                        wx, wy = self.chunk_to_world(cx, cy, tx, ty)
-                        self.tile_cache.pop((wx, wy), None)
-                del self.chunks[key]
\ No newline at end of file
+            if key not in loaded_chunks and max(abs(key[0] - cx), abs(key[1] - cy)) > keep:
+                self.evict_chunk(key[0], key[1])
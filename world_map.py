@@ -0,0 +1,178 @@
+# Zoomable world map backed by a persisted mip pyramid.
+# Level 0 holds a MAP_CELL x MAP_CELL color thumbnail of every explored chunk,
+# one pixel per tile. Each level above merges 2x2 cells of the level below into
+# one cell of the same size, so level L cell (x, y) covers chunks
+# (x << L .. (x + 1 << L) - 1, same for y). Any zoom draws a bounded number of
+# cells, and the map never needs the chunks themselves loaded in World.
+# Cells are kept as NumPy RGB arrays, updated from tile change events and
+# stored zlib-compressed next to the chunks: one r.*.map region file holds
+# every level's cells over the region's REGION_SIZE x REGION_SIZE chunks.
+
+import zlib
+import numpy as np
+from constants import CHUNK_SIZE, MAP_LEVELS, REGION_SIZE
+from region import RegionStore
+
+MAP_CELL = CHUNK_SIZE  # Pixels per side of a cell at every level
+UNEXPLORED = (0, 0, 0)  # Color of chunks that were never loaded
+# First header entry of each level in a map region file; level L has (REGION_SIZE >> L) ** 2 cells
+LEVEL_OFFSETS = tuple(sum((REGION_SIZE >> below) ** 2 for below in range(level)) for level in range(MAP_LEVELS))
+
+
+class MapStore(RegionStore):
+    """Map cells of all levels, one region file per region of chunks.
+
+    A region's cells at every level share one header, so a small world
+    costs a few files instead of one per level per region. Needs
+    REGION_SIZE >> (MAP_LEVELS - 1) >= 1: the top level still has a cell
+    per region.
+    """
+
+    records = LEVEL_OFFSETS[-1] + (REGION_SIZE >> (MAP_LEVELS - 1)) ** 2
+
+    def __init__(self, directory):
+        super().__init__(directory, "map")
+
+    def cell_slot(self, level, x, y):
+        side = REGION_SIZE >> level  # Cells per region side at this level
+        return (x // side, y // side), LEVEL_OFFSETS[level] + (y % side) * side + x % side
+
+    def read_cell(self, level, x, y):
+        return self.read_record(*self.cell_slot(level, x, y))
+
+    def write_cell(self, level, x, y, record):
+        self.write_record(*self.cell_slot(level, x, y), record)
+
+
+class WorldMap:
+    """Mip pyramid of explored chunks' colors.
+
+    Feed it chunks with explore() and tile changes with apply_changes()
+    (a World subscriber). Levels above 0 are rebuilt lazily: changed
+    level 0 cells mark their ancestors stale, and cell() refreshes a stale
+    cell from its four children before returning it.
+    """
+
+    def __init__(self, directory, palette):
+        self.palette = np.array(palette, dtype=np.uint8)  # Tile value -> RGB, 256 entries
+        self.store = MapStore(directory)
+        self.cells = [{} for _ in range(MAP_LEVELS)]  # Per level: {(x, y): MAP_CELL x MAP_CELL x 3 array, or None if unexplored}
+        self.stale = [set() for _ in range(MAP_LEVELS)]  # Cells to rebuild from their children before use
+        self.unsaved = [set() for _ in range(MAP_LEVELS)]  # Cells changed since the last save()
+        self.explored = set()  # Chunks whose thumbnail was taken this session
+        self.version = 0  # Bumped on every change, so views know when to redraw
+
+    def explore(self, chunks):
+        """Take thumbnails of chunks not seen yet this session.
+
+        Args:
+            chunks (dict): {(cx, cy): CHUNK_AREA tile bytes}, usually World.chunks.
+        """
+        for key in chunks.keys() - self.explored:
+            self.explored.add(key)
+            tiles = np.frombuffer(chunks[key], dtype=np.uint8).reshape(MAP_CELL, MAP_CELL)
+            thumbnail = self.palette[tiles]
+            old = self.cell(0, *key)
+            if old is None or not np.array_equal(old, thumbnail):
+                self.cells[0][key] = thumbnail
+                self._changed(*key)
+
+    def apply_changes(self, changes):
+        # World subscriber: repaint changed tiles of explored chunks.
+        for x, y, old, new in changes:
+            key = (x // CHUNK_SIZE, y // CHUNK_SIZE)
+            thumbnail = self.cells[0].get(key)
+            if thumbnail is not None:
+                thumbnail[y - key[1] * CHUNK_SIZE, x - key[0] * CHUNK_SIZE] = self.palette[new]
+                self._changed(*key)
+
+    def _changed(self, cx, cy):
+        self.unsaved[0].add((cx, cy))
+        for level in range(1, MAP_LEVELS):
+            self.stale[level].add((cx >> level, cy >> level))
+        self.version += 1
+
+    def cell(self, level, x, y):
+        """Return the RGB array of a cell, or None if nothing in it was explored.
+
+        Loads the cell from disk on first use and rebuilds it if tiles under
+        it changed since it was last built.
+        """
+        cells = self.cells[level]
+        if (x, y) in self.stale[level]:
+            self.stale[level].discard((x, y))
+            cells[(x, y)] = self._merge(level, x, y)
+            self.unsaved[level].add((x, y))
+        elif (x, y) not in cells:
+            cells[(x, y)] = self._load(level, x, y)
+        return cells[(x, y)]
+
+    def _merge(self, level, x, y):
+        # Average each child's 2x2 pixel blocks into one quadrant of the parent.
+        children = [self.cell(level - 1, 2 * x + dx, 2 * y + dy) for dy in (0, 1) for dx in (0, 1)]
+        if all(child is None for child in children):
+            return None
+        half = MAP_CELL // 2
+        merged = np.empty((MAP_CELL, MAP_CELL, 3), dtype=np.uint8)
+        merged[:] = UNEXPLORED
+        for i, child in enumerate(children):
+            if child is not None:
+                quadrant = child.reshape(half, 2, half, 2, 3).mean(axis=(1, 3))
+                oy, ox = (i // 2) * half, (i % 2) * half
+                merged[oy:oy + half, ox:ox + half] = quadrant
+        return merged
+
+    def _load(self, level, x, y):
+        try:
+            record = self.store.read_cell(level, x, y)
+        except OSError as e:
+            print(f"Error loading map cell {level}:({x}, {y}): {e}")
+            return None
+        if not record:
+            return None
+        try:
+            return np.frombuffer(zlib.decompress(record), dtype=np.uint8).reshape(MAP_CELL, MAP_CELL, 3).copy()
+        except (zlib.error, ValueError) as e:
+            print(f"Error decoding map cell {level}:({x}, {y}): {e}")
+        # Corrupt or truncated: treat the cell as missing. Level 0 is retaken by explore();
+        # higher levels are rebuilt from their children now and saved again.
+        if level == 0:
+            return None
+        self.unsaved[level].add((x, y))
+        return self._merge(level, x, y)
+
+    def save(self, defer=None):
+        """Write changed cells to disk.
+
+        Stale cells are rebuilt first so every level on disk is current.
+        The cells are compressed here; defer, if given, runs the writes
+        later (World.saver.call puts them on the chunk saver thread).
+        """
+        for level in range(1, MAP_LEVELS):
+            for x, y in list(self.stale[level]):
+                self.cell(level, x, y)
+        records = []
+        for level in range(MAP_LEVELS):
+            for x, y in self.unsaved[level]:
+                cell = self.cells[level].get((x, y))
+                if cell is not None:
+                    records.append((level, x, y, zlib.compress(cell.tobytes(), 1)))
+            self.unsaved[level].clear()
+        if not records:
+            return
+
+        def write():
+            for level, x, y, record in records:
+                try:
+                    self.store.write_cell(level, x, y, record)
+                except OSError as e:
+                    print(f"Error saving map cell {level}:({x}, {y}): {e}")
+
+        if defer is None:
+            write()
+        else:
+            defer(write)
+
+    def close(self):
+        self.save()
+        self.store.close()